@@ -0,0 +1,230 @@
+from gym import spaces
+import numpy as np
+from WeatherSim import WeatherSim
+from CropSim import CropSim, WheatGrowthModel
+from Calendar import START_YEAR, get_calendar
+from SoilSim import SoilSim
+from Seeding import LaneGenerators, seed_sequence, make_rng
+from Observation import (OBSERVATION_KEYS, check_observation_mode, flat_observation_space,
+                         write_flat_observation)
+
+# Index of info["termination_reason"] into this tuple gives the WheatGrowthEnv message
+TERMINATION_REASONS = (
+    "Growth stage reached 12 and harvest >= 30",
+    "Harvest fell below 10 before growth stage reached 12",
+    "Growth stage reached 5 before harvest fell below 30",
+)
+
+
+class BatchedWheatGrowthEnv:
+  """
+  Simulate ``n_envs`` independent wheat fields at once.
+
+  Every state variable of WheatGrowthEnv is kept as a length ``n_envs`` array and
+  ``step`` advances all fields by one day with array operations. Fields whose
+  episode ends are reset on the spot; their last observation is returned in
+  ``info["final_observation"]``.
+
+  With ``observation_mode="flat"`` observations are an (n_envs, F) float32
+  view of one preallocated buffer, one row per field and columns in
+  OBSERVATION_KEYS order. The same view is returned by every step and
+  overwritten in place, so copy it to keep an observation.
+  """
+
+  def __init__(self, n_envs, start_month, start_day, end_month, end_day, seed=None,
+               observation_mode="dict"):
+    if n_envs < 1:
+        raise ValueError(f"n_envs must be at least 1, got {n_envs}")
+    self.n_envs = n_envs
+
+    # Simulators providing the physics shared with WheatGrowthEnv
+    self.crop_sim = CropSim()
+    self.wheat_growth = WheatGrowthModel()
+    self.weather_sim = WeatherSim()
+    self.calendar = get_calendar()
+    self.soil_sim = SoilSim()
+
+    # Irrigation amount of a single field and of the whole batch
+    self.single_action_space = spaces.Box(low=0, high=11, shape=(1,), dtype=float)
+    self.action_space = spaces.Box(low=0, high=11, shape=(n_envs,), dtype=float)
+
+    self.observation_mode = check_observation_mode(observation_mode)
+    if observation_mode == "flat":
+        self.single_observation_space = flat_observation_space()
+        self.observation_space = flat_observation_space(n_envs)
+        self._flat_observation = np.zeros((len(OBSERVATION_KEYS), n_envs), dtype=np.float32)
+
+    # Start and end dates
+    self.start_month = start_month
+    self.start_day = start_day
+    self.end_month = end_month
+    self.end_day = end_day
+    self.start_ordinal = self.calendar.ordinal(START_YEAR, start_month, start_day)
+
+    self.seed(seed)
+    self._reset_lanes(np.ones(n_envs, dtype=bool))
+
+  def seed(self, seed=None):
+      """
+      Seed the simulators of the batch.
+
+      Parameters:
+      - seed: An integer, None or SeedSequence gives one generator shared by the
+        whole batch, like in WheatGrowthEnv. A list of ``n_envs`` of them gives
+        every field its own generator (see Seeding.LaneGenerators), so a field's
+        trajectory only depends on its own seed.
+      """
+      if isinstance(seed, (list, tuple)):
+          if len(seed) != self.n_envs:
+              raise ValueError(f"Expected {self.n_envs} field seeds, got {len(seed)}")
+          seeds = [seed_sequence(lane_seed) for lane_seed in seed]
+          self.np_random = LaneGenerators(seeds)
+          entropy = [lane_seed.entropy for lane_seed in seeds]
+      else:
+          seed = seed_sequence(seed)
+          self.np_random = make_rng(seed)
+          entropy = [seed.entropy]
+      self.weather_sim.rng = self.np_random
+      self.soil_sim.rng = self.np_random
+      self.wheat_growth.rng = self.np_random
+      return entropy
+
+  def reset(self, seed=None):
+    if seed is not None:
+        self.seed(seed)
+    self._reset_lanes(np.ones(self.n_envs, dtype=bool))
+    return self._get_observation()
+
+  def _reset_lanes(self, lanes):
+    # Initialize state variables of the selected fields
+    n = self.n_envs
+    if lanes.all():
+        int_zeros, float_zeros = (lambda: np.zeros(n, dtype=int)), (lambda: np.zeros(n))
+        self.date_ordinal = np.full(n, self.start_ordinal)
+        self._set_dates()
+        self.daily_temperature = float_zeros()
+        self.growth_stage = float_zeros()
+        self.accumulated_gdd = float_zeros()
+        self.accumulated_excess = float_zeros()
+        self.accumulated_scarcity = float_zeros()
+        self.soil_moisture_content = float_zeros()
+        self.water_needs = float_zeros()
+        self.harvest = np.full(n, 100.0)
+        self.etc = float_zeros()
+        self.et0 = float_zeros()
+        self.rainfall = float_zeros()
+        self.humidity = float_zeros()
+        self.is_raining = int_zeros()
+        self.sky_clearness = float_zeros()
+        self.is_cloudy = int_zeros()
+        self.rn_daily = float_zeros()
+        self.qv2m = float_zeros()
+        self.PS = float_zeros()
+        self.wind_speed = float_zeros()
+        self.is_crop_sick = int_zeros()
+        self.is_success = np.zeros(n, dtype=bool)
+        return
+
+    self.date_ordinal[lanes] = self.start_ordinal
+    self._set_dates()
+    self.harvest[lanes] = 100.0
+    self.is_success[lanes] = False
+    for name in ("daily_temperature", "growth_stage", "accumulated_gdd", "accumulated_excess",
+                 "accumulated_scarcity", "soil_moisture_content", "water_needs", "etc", "et0",
+                 "rainfall", "humidity", "is_raining", "sky_clearness", "is_cloudy", "rn_daily",
+                 "qv2m", "PS", "wind_speed", "is_crop_sick"):
+        getattr(self, name)[lanes] = 0
+
+  def _set_dates(self):
+    # Calendar fields of every field's date ordinal; current_day is the day of the year
+    calendar = self.calendar
+    self.current_year = calendar.years[self.date_ordinal]
+    self.current_month = calendar.months[self.date_ordinal]
+    self.current_month_day = calendar.days[self.date_ordinal]
+    self.current_day = calendar.doys[self.date_ordinal]
+
+  def _simulate_growth(self, action):
+    # Get Weather related values
+    weather = self.weather_sim.sim_weather_batch(self.current_month)
+    self.daily_temperature = weather['temperature']
+    self.humidity = weather['humidity']
+    self.wind_speed = weather['wind_speed']
+    self.is_raining = weather['is_raining'].astype(int)
+    self.rainfall = weather['rain_quantity']
+    self.sky_clearness = weather['sky_clearness']
+    self.is_cloudy = weather['is_cloudy'].astype(int)
+    self.et0 = weather['evaporation']
+    self.rn_daily = weather['rn_daily']
+    self.qv2m = weather['qv2m']
+    self.PS = weather['ps']
+
+    # Get Crop Related Values
+    self.accumulated_gdd = self.accumulated_gdd + self.wheat_growth.calculate_gdd_batch(self.daily_temperature)
+    self.growth_stage = self.wheat_growth.get_growth_stage_batch(self.accumulated_gdd)
+    self.etc = self.wheat_growth._get_etc_batch(self.growth_stage, self.et0)
+    self.water_needs = self.wheat_growth.calculate_water_needs_batch(self.daily_temperature, self.growth_stage)
+    self.water_needs += self.etc
+
+    # Get soil Related values, add the action and remove the water needs
+    self.soil_moisture_content = (self.soil_moisture_content
+                                  + self.soil_sim.get_surface_soil_wetness_batch(self.current_month)
+                                  + action - self.water_needs)
+
+    # Calculate water excess and deficit
+    self.accumulated_scarcity = self.accumulated_scarcity - np.minimum(0, self.soil_moisture_content)
+    self.accumulated_excess = self.accumulated_excess + np.maximum(0, self.soil_moisture_content)
+
+    # Check water usage effect on harvest and update it
+    self.harvest = self.crop_sim.calculate_water_effect_on_yield_batch(
+        self.harvest, self.accumulated_excess, self.accumulated_scarcity)
+
+    # Check diseases
+    self.is_crop_sick = self.crop_sim.is_crop_sick_batch(
+        self.accumulated_scarcity, self.accumulated_excess).astype(int)
+
+    # update date
+    self.date_ordinal += 1
+    self._set_dates()
+
+  def step(self, actions):
+    actions = np.asarray(actions, dtype=float).reshape(self.n_envs)
+    self._simulate_growth(actions)
+    reward = self._calculate_reward(actions, self.water_needs, self.soil_moisture_content)
+
+    # Same termination rules as WheatGrowthEnv.step
+    finished = self.growth_stage == self.wheat_growth.stage_table.done_code
+    late = self.growth_stage >= 12
+    reached_end = finished | (late & (self.harvest >= 30))
+    fell_short = ~reached_end & (finished | late)
+    low_harvest = ~reached_end & ~fell_short & (self.harvest < 30)
+    done = reached_end | (fell_short & (self.harvest < 10)) | (low_harvest & (self.growth_stage >= 3))
+
+    self.is_success |= done & (finished | (late & (self.harvest > 30) & (self.growth_stage != 0)))
+    info = {
+        "is_success": self.is_success.copy(),
+        "termination_reason": np.where(reached_end, 0, np.where(fell_short, 1, 2)),
+    }
+
+    observation = self._get_observation()
+    if done.any():
+        # Flat observations are overwritten by the reset below
+        info["final_observation"] = observation.copy() if self.observation_mode == "flat" else observation
+        self._reset_lanes(done)
+        observation = self._get_observation()
+
+    return observation, reward, done, info
+
+  def _get_observation(self):
+    if self.observation_mode == "flat":
+        return write_flat_observation(self, self._flat_observation)
+
+    # Return a copy of the current state variables, one array per key
+    return {key: getattr(self, key).copy() for key in OBSERVATION_KEYS}
+
+  def _calculate_reward(self, irrigation, water_needs, soil_moisture_content):
+    # Vectorized WheatGrowthEnv._calculate_reward
+    yield_reward = np.where(self.harvest >= 30, 1.0, -1.0)
+    water_gap = np.abs(irrigation - water_needs)
+    water_use_penalty = np.where(water_gap == 0, 1.0, -1 - water_gap * 0.1)
+    soil_moisture_penalty = np.where(soil_moisture_content <= 2, 1.0, -1.0)
+    return 0.4 * yield_reward + 0.4 * water_use_penalty + 0.2 * soil_moisture_penalty
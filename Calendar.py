@@ -0,0 +1,67 @@
+import numpy as np
+
+# Year the simulated seasons start in
+START_YEAR = 2015
+
+# Season code of every month (index 0 unused): 1 Spring (Mar-May), 2 Summer (Jun-Jul),
+# 3 Fall (Aug-Nov), 4 Winter (Dec-Feb), as in DateSIM.SEASONS
+MONTH_SEASONS = np.array([0, 4, 4, 1, 1, 1, 2, 2, 3, 3, 3, 3, 4])
+
+
+class Calendar:
+    """
+    Day ordinal -> (year, month, day of month, day of year, season) table.
+
+    Ordinal 0 is January 1st of ``first_year`` and the table covers every day up
+    to December 31st of ``last_year``, computed with numpy.datetime64, so leap
+    years and month lengths are the real ones. Advancing a date is an integer
+    increment of its ordinal, and arrays of ordinals index the column arrays
+    directly.
+    """
+
+    def __init__(self, first_year=1981, last_year=2100):
+        self.first_year = first_year
+        self.last_year = last_year
+        self.dates = np.arange(np.datetime64(f"{first_year:04d}-01-01"),
+                               np.datetime64(f"{last_year + 1:04d}-01-01"), dtype="datetime64[D]")
+
+        month_starts = self.dates.astype("datetime64[M]")
+        self.years = month_starts.astype("datetime64[Y]").astype(int) + 1970
+        self.months = month_starts.astype(int) % 12 + 1
+        self.days = (self.dates - month_starts).astype(int) + 1
+        self.doys = (self.dates - self.dates.astype("datetime64[Y]")).astype(int) + 1
+        self.seasons = MONTH_SEASONS[self.months]
+        for column in (self.dates, self.years, self.months, self.days, self.doys, self.seasons):
+            column.flags.writeable = False
+
+        # Python ints of every row, for the scalar environments
+        self._rows = list(zip(self.years.tolist(), self.months.tolist(), self.days.tolist(),
+                              self.doys.tolist(), self.seasons.tolist()))
+
+    def __len__(self):
+        return len(self.dates)
+
+    def ordinal(self, year, month, day):
+        """Ordinal of a date of the table."""
+        ordinal = int((np.datetime64(f"{year:04d}-{month:02d}-{day:02d}") - self.dates[0]).astype(int))
+        if not 0 <= ordinal < len(self.dates):
+            raise ValueError(f"{year:04d}-{month:02d}-{day:02d} is outside the calendar "
+                             f"({self.first_year}-{self.last_year})")
+        return ordinal
+
+    def date(self, ordinal):
+        """(year, month, day of month, day of year, season) of one ordinal, as Python ints."""
+        return self._rows[ordinal]
+
+
+_calendars = {}
+
+
+def get_calendar(first_year=1981, last_year=2100):
+    """Return the shared Calendar of the year range, building it on first use."""
+    key = (first_year, last_year)
+    calendar = _calendars.get(key)
+    if calendar is None:
+        calendar = Calendar(first_year, last_year)
+        _calendars[key] = calendar
+    return calendar
@@ -0,0 +1,115 @@
+import os
+
+import numpy as np
+
+from CsvCache import load_cached_columns
+
+DEFAULT_STATS_PATH = "meteorological_data_statistics.csv"
+
+
+def read_stats_csv(path):
+    """Read a statistics CSV into a dict of column name -> float array."""
+    # pandas is only needed when the binary cache has to be (re)built
+    import pandas as pd
+    stats_df = pd.read_csv(path)
+    return {column: stats_df[column].to_numpy(dtype=float) for column in stats_df.columns}
+
+
+class Climatology:
+    """
+    Monthly weather statistics held as immutable NumPy arrays.
+
+    Each ``*_Mean`` / ``*_StdDev`` / ``*_IQR`` column group of the statistics
+    CSV becomes one column of a 12 x N array, where row ``month - 1`` holds the
+    values for that month and N is the number of variables.
+    """
+
+    def __init__(self, path=DEFAULT_STATS_PATH, use_cache=True):
+        if use_cache:
+            stats = load_cached_columns(path, read_stats_csv, kind="climatology")
+        else:
+            stats = read_stats_csv(path)
+
+        self.path = path
+        self.variables = tuple(column[:-len("_Mean")] for column in stats
+                               if column.endswith("_Mean"))
+        self._columns = {name: index for index, name in enumerate(self.variables)}
+        self._column_sets = {}
+
+        months = np.asarray(stats["Month"]).astype(int)
+        if np.any((months < 1) | (months > 12)):
+            raise ValueError(f"Invalid month in {path}: months must be between 1 and 12")
+
+        self.means = self._month_table(stats, months, "Mean")
+        self.std_devs = self._month_table(stats, months, "StdDev")
+        self.iqrs = self._month_table(stats, months, "IQR")
+
+        self.available_months = np.zeros(12, dtype=bool)
+        self.available_months[months - 1] = True
+        self.available_months.flags.writeable = False
+
+    def _month_table(self, stats, months, statistic):
+        table = np.full((12, len(self.variables)), np.nan)
+        columns = [f"{name}_{statistic}" for name in self.variables]
+        if all(column in stats for column in columns):
+            table[months - 1] = np.column_stack([stats[column] for column in columns])
+        table.flags.writeable = False
+        return table
+
+    def column(self, name):
+        """Return the column index of a variable, e.g. ``column("T2M")``."""
+        try:
+            return self._columns[name]
+        except KeyError:
+            raise KeyError(f"Variable {name} not found in {self.path}") from None
+
+    def columns(self, names):
+        """Return the column indices of several variables as an integer array."""
+        names = tuple(names)
+        indices = self._column_sets.get(names)
+        if indices is None:
+            indices = np.array([self.column(name) for name in names], dtype=int)
+            indices.flags.writeable = False
+            self._column_sets[names] = indices
+        return indices
+
+    def month_stats(self, month):
+        """
+        Get the statistics row for a month.
+
+        Returns:
+        - means: Mean of every variable for the month (length N array).
+        - std_devs: Standard deviation of every variable for the month (length N array).
+        """
+        if not (1 <= month <= 12) or not self.available_months[month - 1]:
+            raise ValueError(f"No data available for month {month}")
+        return self.means[month - 1], self.std_devs[month - 1]
+
+
+_climatologies = {}
+
+
+def _cache_key(path):
+    return os.path.abspath(path)
+
+
+def get_climatology(path=DEFAULT_STATS_PATH):
+    """Return the shared climatology for ``path``, loading it on first use."""
+    key = _cache_key(path)
+    climatology = _climatologies.get(key)
+    if climatology is None:
+        climatology = Climatology(path)
+        _climatologies[key] = climatology
+    return climatology
+
+
+def reload_climatology(path=DEFAULT_STATS_PATH):
+    """
+    Re-read the statistics file at ``path`` and replace the shared copy.
+
+    Simulators created with ``stats_path`` pick up the new statistics on their
+    next draw, so site statistics can be swapped without restarting a worker.
+    """
+    climatology = Climatology(path)
+    _climatologies[_cache_key(path)] = climatology
+    return climatology
@@ -0,0 +1,273 @@
+"""
+Streaming builder of monthly weather statistics from POWER daily exports.
+
+    builder = ClimatologyBuilder()
+    builder.add_power_csv("site_a_daily.csv", "site_a_sici.csv", site="a")
+    builder.add_power_csv("site_b_daily.csv", "site_b_sici.csv", site="b")
+    builder.write_csv("meteorological_data_statistics.csv")
+
+Exports are read in chunks of ``chunk_size`` rows. Every (site, month,
+variable) keeps a running count, mean and sum of squared deviations (Welford's
+method, merged chunk by chunk) and a QuantileSketch for the IQR. Memory
+therefore depends on the number of sites, not on the length of the exports. The
+statistics are written in the layout of PowerDataPrep.stats_columns, which
+Climatology reads for WeatherSim and SoilSim.
+"""
+import numpy as np
+
+from HistoricalWeather import MISSING_VALUE, daily_net_radiation, power_dates, power_header_lines
+from PowerDataPrep import STATS_VARIABLES, stats_columns, write_stats_csv
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+class QuantileSketch:
+    """
+    Mergeable approximate quantiles of a stream of values, in the style of a merging t-digest.
+
+    Values are buffered and merged into at most about ``compression / 2``
+    weighted centroids. Centroids are small near the extremes and larger near
+    the median, so the tails stay accurate. Until the first merge every value
+    is its own centroid, and ``quantile`` then equals numpy.percentile
+    (linear interpolation).
+    """
+
+    def __init__(self, compression=100, buffer_size=None):
+        self.compression = compression
+        self.buffer_size = buffer_size if buffer_size is not None else 10 * compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self._buffer = []
+        self._buffered = 0
+
+    @property
+    def count(self):
+        return float(self.weights.sum()) + self._buffered
+
+    def add(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if len(values):
+            self._add(values, np.ones(len(values)))
+
+    def merge(self, other):
+        """Add the centroids and buffered values of another sketch."""
+        other._flush(compress=False)
+        if len(other.means):
+            self._add(other.means, other.weights)
+
+    def _add(self, means, weights):
+        self._buffer.append((means, weights))
+        self._buffered += len(means)
+        if self._buffered > self.buffer_size:
+            self._flush(compress=True)
+
+    def _flush(self, compress):
+        if not self._buffer:
+            return
+        means = np.concatenate([self.means] + [means for means, _ in self._buffer])
+        weights = np.concatenate([self.weights] + [weights for _, weights in self._buffer])
+        self._buffer = []
+        self._buffered = 0
+
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        if compress and len(means) > self.compression:
+            # Cluster by the k1 scale function k(q) = compression / (2 pi) * arcsin(2q - 1),
+            # one cluster per unit of k
+            cumulative = np.cumsum(weights)
+            q = (cumulative - weights / 2) / cumulative[-1]
+            k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+            clusters = np.floor(k - k[0]).astype(int)
+            clusters = np.concatenate([[0], np.cumsum(np.diff(clusters) != 0)])
+            cluster_weights = np.bincount(clusters, weights)
+            means = np.bincount(clusters, weights * means) / cluster_weights
+            weights = cluster_weights
+        self.means, self.weights = means, weights
+
+    def quantile(self, q):
+        """Approximate q-quantile(s), q in [0, 1]; NaN for an empty sketch."""
+        self._flush(compress=False)
+        if len(self.means) == 0:
+            return np.full(np.shape(q), np.nan)
+        # Centroid i covers the 0-based ranks cumulative[i] - weights[i] .. cumulative[i] - 1
+        cumulative = np.cumsum(self.weights)
+        centers = cumulative - (self.weights + 1) / 2
+        return np.interp(np.asarray(q) * (cumulative[-1] - 1), centers, self.means)
+
+
+class _SiteStatistics:
+    # Running moments and sketches of one site, indexed [month - 1, variable]
+
+    def __init__(self, n_variables, compression):
+        self.count = np.zeros((12, n_variables))
+        self.mean = np.zeros((12, n_variables))
+        self.m2 = np.zeros((12, n_variables))
+        self.sketches = [[QuantileSketch(compression) for _ in range(n_variables)] for _ in range(12)]
+
+    def merge_moments(self, count, mean, m2):
+        # Chan et al.'s pairwise combination of two Welford states
+        total = self.count + count
+        safe_total = np.where(total > 0, total, 1)
+        delta = mean - self.mean
+        self.mean += delta * count / safe_total
+        self.m2 += m2 + delta ** 2 * self.count * count / safe_total
+        self.count = total
+
+
+class ClimatologyBuilder:
+    """
+    Per-(site, month, variable) mean, standard deviation and IQR built from chunks of daily rows.
+
+    ``add_rows`` takes one chunk of any source and ``add_power_csv`` streams a
+    POWER export through it. ``statistics(site)`` gives the statistics of one
+    site, or of all sites pooled when ``site`` is None.
+    """
+
+    def __init__(self, variables=STATS_VARIABLES, compression=100):
+        self.variables = tuple(variables)
+        self.compression = compression
+        self.sites = {}
+
+    def add_rows(self, site, months, columns):
+        """
+        Add one chunk of daily rows of a site.
+
+        Parameters:
+        - months: Month (1-12) of every row.
+        - columns: Dict of variable name -> values of every row; NaN values are skipped.
+        """
+        site_statistics = self.sites.get(site)
+        if site_statistics is None:
+            site_statistics = self.sites[site] = _SiteStatistics(len(self.variables), self.compression)
+        months = np.asarray(months).astype(int) - 1
+
+        count = np.zeros((12, len(self.variables)))
+        mean = np.zeros_like(count)
+        m2 = np.zeros_like(count)
+        for index, variable in enumerate(self.variables):
+            values = np.asarray(columns[variable], dtype=float)
+            valid = ~np.isnan(values)
+            values, value_months = values[valid], months[valid]
+            # Moments of the chunk, one bincount per statistic for all months
+            count[:, index] = np.bincount(value_months, minlength=12)
+            mean[:, index] = np.bincount(value_months, values, minlength=12) / np.maximum(count[:, index], 1)
+            m2[:, index] = np.bincount(value_months, (values - mean[value_months, index]) ** 2, minlength=12)
+
+            order = np.argsort(value_months, kind="stable")
+            bounds = np.searchsorted(value_months[order], np.arange(1, 13))
+            for month, month_values in enumerate(np.split(values[order], bounds[:-1])):
+                site_statistics.sketches[month][index].add(month_values)
+        site_statistics.merge_moments(count, mean, m2)
+
+    def add_power_csv(self, daily_csv, sici_csv=None, site=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Stream a POWER daily export, optionally with its SICI export, into the statistics.
+
+        rn_daily is derived from ALLSKY_KT (a column of the daily export or of
+        ``sici_csv``) with HistoricalWeather.daily_net_radiation. ``site``
+        defaults to the path of the daily export.
+        """
+        site = daily_csv if site is None else site
+        sici_chunks = _SiciAligner(_read_power_chunks(sici_csv, chunk_size)) if sici_csv is not None else None
+        for columns in _read_power_chunks(daily_csv, chunk_size):
+            dates = power_dates(columns)
+            if sici_chunks is not None:
+                columns["ALLSKY_KT"] = sici_chunks.values(dates)
+            if "rn_daily" in self.variables and "ALLSKY_KT" in columns:
+                columns["rn_daily"] = daily_net_radiation(dates, columns["ALLSKY_KT"])
+            months = dates.astype("datetime64[M]").astype(int) % 12 + 1
+            self.add_rows(site, months, columns)
+
+    def _pooled(self, site):
+        if site is not None:
+            return self.sites[site]
+        pooled = _SiteStatistics(len(self.variables), self.compression)
+        for site_statistics in self.sites.values():
+            pooled.merge_moments(site_statistics.count, site_statistics.mean, site_statistics.m2)
+            for month in range(12):
+                for index in range(len(self.variables)):
+                    pooled.sketches[month][index].merge(site_statistics.sketches[month][index])
+        return pooled
+
+    def statistics(self, site=None):
+        """
+        Returns:
+        - stats: Dict of PowerDataPrep.stats_columns(variables) -> one value per month
+          with data, the layout of meteorological_data_statistics.csv.
+        """
+        pooled = self._pooled(site)
+        present = np.flatnonzero(pooled.count.any(axis=1))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(pooled.count > 0, pooled.mean, np.nan)
+            std_devs = np.sqrt(pooled.m2 / (pooled.count - 1))
+        std_devs[pooled.count < 2] = np.nan
+
+        stats = {column: np.empty(len(present)) for column in stats_columns(self.variables)}
+        stats["Month"] = present + 1.0
+        for row, month in enumerate(present):
+            for index, variable in enumerate(self.variables):
+                q1, q3 = pooled.sketches[month][index].quantile([0.25, 0.75])
+                stats[f"{variable}_Mean"][row] = means[month, index]
+                stats[f"{variable}_StdDev"][row] = std_devs[month, index]
+                stats[f"{variable}_IQR"][row] = q3 - q1
+        return stats
+
+    def write_csv(self, path, site=None):
+        write_stats_csv(self.statistics(site), path)
+
+
+def _read_power_chunks(path, chunk_size):
+    # Columns of ``chunk_size`` rows at a time; pandas is only needed to read exports
+    import pandas as pd
+    reader = pd.read_csv(path, skiprows=power_header_lines(path), na_values=[MISSING_VALUE], chunksize=chunk_size)
+    for chunk in reader:
+        yield {column: chunk[column].to_numpy(dtype=float) for column in chunk.columns}
+
+
+class _SiciAligner:
+    # ALLSKY_KT of the SICI export aligned on the dates of successive daily chunks.
+    # Both exports are in date order, so only the SICI rows ahead of the daily
+    # chunks are held.
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._dates = np.empty(0, dtype="datetime64[D]")
+        self._values = np.empty(0)
+
+    def values(self, dates):
+        while len(self._dates) == 0 or self._dates[-1] < dates[-1]:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._dates = np.concatenate([self._dates, power_dates(chunk)])
+            self._values = np.concatenate([self._values, chunk["ALLSKY_KT"]])
+
+        joined = np.full(len(dates), np.nan)
+        positions = np.searchsorted(dates, self._dates)
+        inside = positions < len(dates)
+        inside[inside] = dates[positions[inside]] == self._dates[inside]
+        joined[positions[inside]] = self._values[inside]
+
+        keep = self._dates > dates[-1]
+        self._dates, self._values = self._dates[keep], self._values[keep]
+        return joined
+
+
+def build_climatology(sources, stats_csv=None, chunk_size=DEFAULT_CHUNK_SIZE, compression=100):
+    """
+    Pooled statistics of several POWER exports.
+
+    Parameters:
+    - sources: Iterable of (site, daily_csv, sici_csv or None).
+    - stats_csv: Optional path to write the statistics to.
+
+    Returns:
+    - builder: The ClimatologyBuilder, for per-site statistics.
+    """
+    builder = ClimatologyBuilder(compression=compression)
+    for site, daily_csv, sici_csv in sources:
+        builder.add_power_csv(daily_csv, sici_csv, site=site, chunk_size=chunk_size)
+    if stats_csv is not None:
+        builder.write_csv(stats_csv)
+    return builder
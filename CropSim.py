@@ -1,10 +1,218 @@
-import random
+import bisect
+import json
+
+import numpy as np
+
+# Numeric stage code of a crop whose growth is complete
+DONE_STAGE = 13.0
+
+# Wheat growth stages as (stage, description, GDD required, accumulated GDD at which the stage ends)
+DEFAULT_GROWTH_STAGES = {
+    "stages": [
+        [0.5, "Emergence Date", 180, 180],
+        [1.0, "Leaf 1 fully extended", 72, 252],
+        [2.0, "Leaf 2 fully extended", 143, 395],
+        [3.0, "Leaf 3 (Tillers Begin To Emerge)", 143, 538],
+        [4.0, "Leaf 4 fully extended", 143, 681],
+        [5.0, "Leaf 5 (Tillering ends)", 143, 824],
+        [6.0, "Leaf 6 (Tillering ends)", 143, 967],
+        [7.0, "Leaf 7 fully extended", 143, 1110],
+        [7.5, "Flag Leaf Visible", 71, 1181],
+        [8.0, "Flag Leaf Emerged", 72, 1255],
+        [9.0, "Boot Swelling Begins", 143, 1396],
+        [10.0, "Boot Completed", 143, 1539],
+        [10.2, "Heading Begins", 28, 1567],
+        [11.0, "Headed (Head Extension Begins)", 115, 1682],
+        [11.4, "Flowering Begins", 57, 1739],
+        [11.6, "Flowering Completed", 29, 1768],
+        [12.0, "Kernel Watery Ripe", 57, 1825],
+    ],
+    "done": [DONE_STAGE, "Crop Growth Complete"],
+}
+
+
+class GrowthStageTable:
+    """
+    Growth stages of a cultivar as parallel arrays, looked up by accumulated GDD.
+
+    ``gdd_thresholds[i]`` is the accumulated GDD at which stage ``codes[i]`` ends;
+    past the last threshold the crop is done (``done_code``). ``lookup`` accepts
+    a scalar or an array of accumulated GDD.
+    """
+
+    def __init__(self, config=DEFAULT_GROWTH_STAGES):
+        stages = config["stages"]
+        done_code, done_description = config["done"]
+        thresholds = np.array([gdd_end for _, _, _, gdd_end in stages], dtype=float)
+        if len(stages) == 0 or np.any(np.diff(thresholds) <= 0):
+            raise ValueError("Growth stages must be listed by strictly increasing GDD")
+
+        self.gdd_thresholds = thresholds
+        self.codes = np.array([code for code, _, _, _ in stages] + [done_code], dtype=float)
+        self.descriptions = np.array([description for _, description, _, _ in stages] + [done_description])
+        # The done stage requires no more GDD
+        self.gdd_required = np.array([required for _, _, required, _ in stages] + [0], dtype=float)
+        self.done_code = float(done_code)
+        for array in (self.gdd_thresholds, self.codes, self.descriptions, self.gdd_required):
+            array.flags.writeable = False
+        # Plain lists for the scalar path, where NumPy call overhead would dominate
+        self._threshold_list = thresholds.tolist()
+        self._stage_rows = list(zip(self.codes.tolist(), self.descriptions.tolist(), self.gdd_required.tolist()))
+
+    @classmethod
+    def from_config(cls, path):
+        """
+        Load a table from a JSON file laid out like DEFAULT_GROWTH_STAGES:
+        ``{"stages": [[stage, description, gdd_required, gdd_end], ...], "done": [stage, description]}``.
+        """
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def lookup(self, gdd_accumulated):
+        """
+        Get the growth stage of one or many accumulated GDD values.
+
+        Returns:
+        - stage: Numeric growth stage (done_code once the crop is complete).
+        - description: Description of the growth stage.
+        - gdd_required: GDD required for the current stage.
+        """
+        if isinstance(gdd_accumulated, (int, float)):
+            return self._stage_rows[bisect.bisect_right(self._threshold_list, gdd_accumulated)]
+        index = np.searchsorted(self.gdd_thresholds, gdd_accumulated, side='right')
+        return self.codes[index], self.descriptions[index], self.gdd_required[index]
+
+
+class SeasonSchedule:
+    """
+    Growth stages of a season whose daily temperatures are known in advance.
+
+    Day ``d`` is the d-th temperature of the series: ``accumulated_gdd[d]`` and
+    ``stages[d]`` are the accumulated GDD and growth stage after that day, as a
+    day-by-day run of calculate_gdd and get_growth_stage_info computes them.
+    ``transition_days[i]`` is the first day whose accumulated GDD reaches
+    ``stage_table.gdd_thresholds[i]``, ending stage ``stage_table.codes[i]``, or
+    the length of the series when the season is too short. ``done_day`` is the
+    day the crop completes, None when it does not.
+    """
+
+    def __init__(self, stage_table, accumulated_gdd):
+        self.stage_table = stage_table
+        self.accumulated_gdd = accumulated_gdd
+        self.stage_index = np.searchsorted(stage_table.gdd_thresholds, accumulated_gdd, side='right')
+        self.stages = stage_table.codes[self.stage_index]
+        # accumulated_gdd never decreases, so the first day at or over each threshold is a search too
+        self.transition_days = np.searchsorted(accumulated_gdd, stage_table.gdd_thresholds, side='left')
+        done_day = int(self.transition_days[-1])
+        self.done_day = done_day if done_day < len(accumulated_gdd) else None
+        # Python rows of every day for the scalar environment
+        self._rows = [stage_table._stage_rows[index] for index in self.stage_index.tolist()]
+
+    def __len__(self):
+        return len(self.accumulated_gdd)
+
+    def stage_info(self, day):
+        """(stage, description, gdd_required) after ``day``, as get_growth_stage_info returns them."""
+        return self._rows[day]
+
+    def start_day(self, stage):
+        """First day at ``stage`` (a code of the stage table), the series length when never reached."""
+        index = int(np.flatnonzero(self.stage_table.codes == stage)[0])
+        return 0 if index == 0 else int(self.transition_days[index - 1])
+
+
+# Diseases as (name, (scarcity low, high), (excess low, high)), matched in order.
+# A field has the first disease whose two intervals (bounds included) hold its
+# accumulated scarcity and excess, "none" otherwise.
+DEFAULT_DISEASES = {
+    "diseases": [
+        ["FHB", [300, 350], [600, 650]],
+        ["LeafBlotch", [250, 300], [550, 600]],
+        ["PowderyMildew", [200, 250], [500, 550]],
+        ["Rust", [200, 250], [450, 500]],
+    ],
+    "none": "NoDisease",
+}
+
+
+class DiseaseTable:
+    """
+    Disease intervals of accumulated water scarcity and excess as parallel arrays.
+
+    Disease codes are integers: 0 is no disease and ``i + 1`` the i-th disease of
+    the config, named ``names[code]``. Row 0 of the bound arrays belongs to no
+    disease and is unbounded, so it never triggers a control action.
+    """
+
+    def __init__(self, config=DEFAULT_DISEASES):
+        diseases = config["diseases"]
+        for name, scarcity, excess in diseases:
+            if scarcity[0] > scarcity[1] or excess[0] > excess[1]:
+                raise ValueError(f"Disease {name} has an empty scarcity or excess interval")
+
+        self.names = np.array([config["none"]] + [name for name, _, _ in diseases])
+        self.scarcity_low = np.array([-np.inf] + [scarcity[0] for _, scarcity, _ in diseases], dtype=float)
+        self.scarcity_high = np.array([np.inf] + [scarcity[1] for _, scarcity, _ in diseases], dtype=float)
+        self.excess_low = np.array([-np.inf] + [excess[0] for _, _, excess in diseases], dtype=float)
+        self.excess_high = np.array([np.inf] + [excess[1] for _, _, excess in diseases], dtype=float)
+        for array in (self.names, self.scarcity_low, self.scarcity_high, self.excess_low, self.excess_high):
+            array.flags.writeable = False
+        self.codes = {name: code for code, name in enumerate(self.names.tolist())}
+        # Plain lists for the scalar path, where NumPy call overhead would dominate
+        self.name_list = self.names.tolist()
+        self._rows = list(zip(range(1, len(self.names)), self.scarcity_low.tolist()[1:],
+                              self.scarcity_high.tolist()[1:], self.excess_low.tolist()[1:],
+                              self.excess_high.tolist()[1:]))
+
+    @classmethod
+    def from_config(cls, path):
+        """
+        Load a table from a JSON file laid out like DEFAULT_DISEASES:
+        ``{"diseases": [[name, [scarcity_low, scarcity_high], [excess_low, excess_high]], ...], "none": name}``.
+        """
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def classify(self, accumulated_scarcity, accumulated_excess):
+        """Disease code of one field."""
+        for code, scarcity_low, scarcity_high, excess_low, excess_high in self._rows:
+            if (scarcity_low <= accumulated_scarcity <= scarcity_high and
+                    excess_low <= accumulated_excess <= excess_high):
+                return code
+        return 0
+
+    def classify_batch(self, accumulated_scarcity, accumulated_excess):
+        """Disease code of every field, as an int array shaped like the inputs."""
+        scarcity = np.asarray(accumulated_scarcity, dtype=float)
+        excess = np.asarray(accumulated_excess, dtype=float)
+        codes = np.zeros(scarcity.shape, dtype=int)
+        # One pass over the fields per disease, in reverse so the first matching disease wins
+        for code, scarcity_low, scarcity_high, excess_low, excess_high in reversed(self._rows):
+            codes[(scarcity >= scarcity_low) & (scarcity <= scarcity_high) &
+                  (excess >= excess_low) & (excess <= excess_high)] = code
+        return codes
+
+    def is_sick(self, accumulated_scarcity, accumulated_excess, code):
+        """
+        Control rule of a field with disease ``code``: sick when its scarcity is below the
+        disease's scarcity interval or its excess above the excess interval.
+        """
+        return (accumulated_scarcity < self.scarcity_low[code] or
+                accumulated_excess > self.excess_high[code])
+
+    def is_sick_batch(self, accumulated_scarcity, accumulated_excess, codes):
+        """Vectorized is_sick, returning a boolean array."""
+        return ((accumulated_scarcity < self.scarcity_low[codes]) |
+                (accumulated_excess > self.excess_high[codes]))
 
 
 class WheatGrowthModel:
-    def __init__(self):
+    def __init__(self, stage_table=None, rng=None):
         self.gdd_accumulated = 0
         self.growth_stages = []
+        self.stage_table = stage_table if stage_table is not None else GrowthStageTable()
+        # numpy.random.Generator behind the random water needs and Kc
+        self.rng = rng if rng is not None else np.random.default_rng()
 
 
     def calculate_gdd(self, temperature, base_temperature=0):
@@ -21,6 +229,26 @@ class WheatGrowthModel:
         gdd = max(0, temperature - base_temperature)
         return gdd
 
+    def precompute_season(self, temperatures, base_temperature=0):
+        """
+        Growth stages of a whole season from its daily temperatures.
+
+        Parameters:
+        - temperatures: 1-D series of daily temperatures in Celsius, e.g. one
+          trajectory of a WeatherBank or a recorded season.
+        - base_temperature: Base temperature for GDD calculation (default is 0°C).
+
+        Returns:
+        - schedule: SeasonSchedule with the accumulated GDD and stage of every day,
+          the day of every stage transition and the day the crop is done.
+        """
+        temperatures = np.asarray(temperatures, dtype=float)
+        if temperatures.ndim != 1:
+            raise ValueError(f"Expected a 1-D temperature series, got shape {temperatures.shape}")
+        # cumsum adds the days in order, as the day-by-day accumulation does
+        accumulated_gdd = np.cumsum(self.calculate_gdd_batch(temperatures, base_temperature))
+        return SeasonSchedule(self.stage_table, accumulated_gdd)
+
     def calculate_water_needs(self, temperature, stage):
         """
         Calculate random water needs based on daily temperature.
@@ -29,17 +257,17 @@ class WheatGrowthModel:
         - water_needs: Grass water needs in millimeters. + 10% for wheat
         """
         if temperature < 15:
-            base_water_needs = random.uniform(4, 6)
+            base_water_needs = self.rng.uniform(4, 6)
         elif 15 <= temperature <= 25:
-            base_water_needs = random.uniform(7, 8)
+            base_water_needs = self.rng.uniform(7, 8)
         else:
-            base_water_needs = random.uniform(9, 10)
+            base_water_needs = self.rng.uniform(9, 10)
         # Apply 10% increase for wheat
         water_needs = base_water_needs * 1.1
         
         #print("The Stage: ", stage)
         
-        if isinstance(stage, str) and stage == "Done":
+        if stage == self.stage_table.done_code:
             water_needs = 0
         elif 0.5 <= stage <= 6.0:
             # 50% of needed water Early stage
@@ -87,7 +315,7 @@ class WheatGrowthModel:
                 "Duration of Previous Stage": self.get_duration_of_previous_stage(),
             })
 
-            if stage == "Done":
+            if stage == self.stage_table.done_code:
               break
 
         return self.growth_stages
@@ -96,48 +324,15 @@ class WheatGrowthModel:
         """
         Get information about the current growth stage based on accumulated GDD.
 
+        ``gdd_accumulated`` may be a scalar or an array of accumulated GDD.
+
         Returns:
-        - stage: Growth stage.
+        - stage: Growth stage, stage_table.done_code once the crop is complete.
         - description: Description of the growth stage.
         - gdd_required: GDD required for the current stage.
         - accumulated_gdd: Total accumulated GDD.
         """
-        if gdd_accumulated < 180:
-            stage, description, gdd_required = 0.5, "Emergence Date", 180
-        elif gdd_accumulated < 252:
-            stage, description, gdd_required = 1.0, "Leaf 1 fully extended", 72
-        elif gdd_accumulated < 395:
-            stage, description, gdd_required = 2.0, "Leaf 2 fully extended", 143
-        elif gdd_accumulated < 538:
-            stage, description, gdd_required = 3.0, "Leaf 3 (Tillers Begin To Emerge)", 143
-        elif gdd_accumulated < 681:
-            stage, description, gdd_required = 4.0, "Leaf 4 fully extended", 143
-        elif gdd_accumulated < 824:
-            stage, description, gdd_required = 5.0, "Leaf 5 (Tillering ends)", 143
-        elif gdd_accumulated < 967:
-            stage, description, gdd_required = 6.0, "Leaf 6 (Tillering ends)", 143
-        elif gdd_accumulated < 1110:
-            stage, description, gdd_required = 7.0, "Leaf 7 fully extended", 143
-        elif gdd_accumulated < 1181:
-            stage, description, gdd_required = 7.5, "Flag Leaf Visible", 71
-        elif gdd_accumulated < 1255:
-            stage, description, gdd_required = 8.0, "Flag Leaf Emerged", 72
-        elif gdd_accumulated < 1396:
-            stage, description, gdd_required = 9.0, "Boot Swelling Begins", 143
-        elif gdd_accumulated < 1539:
-            stage, description, gdd_required = 10.0, "Boot Completed", 143
-        elif gdd_accumulated < 1567:
-            stage, description, gdd_required = 10.2, "Heading Begins", 28
-        elif gdd_accumulated < 1682:
-            stage, description, gdd_required = 11.0, "Headed (Head Extension Begins)", 115
-        elif gdd_accumulated < 1739:
-            stage, description, gdd_required = 11.4, "Flowering Begins", 57
-        elif gdd_accumulated < 1768:
-            stage, description, gdd_required = 11.6, "Flowering Completed", 29
-        elif gdd_accumulated < 1825:
-            stage, description, gdd_required = 12.0, "Kernel Watery Ripe", 57
-        else:
-            stage, description, gdd_required = "Done", "Crop Growth Complete", 0
+        stage, description, gdd_required = self.stage_table.lookup(gdd_accumulated)
 
         return stage, description, gdd_required, self.gdd_accumulated
 
@@ -166,28 +361,74 @@ class WheatGrowthModel:
             return 0
 
     def get_kc(self, stage):
-          if isinstance(stage, str) and stage == "Done":
+          if stage == self.stage_table.done_code:
               # late stage Kc
-              return random.uniform(0.2, 0.5)  
+              return self.rng.uniform(0.2, 0.5)  
           else:
             if 0.5 <= stage <= 6.0:
               # Early stage Kc
-              return random.uniform(0.2, 0.53)
+              return self.rng.uniform(0.2, 0.53)
             elif 7.0 <= stage <= 10.2:
               # Mid stage Kc
-              return random.uniform(0.45, 1.03)
+              return self.rng.uniform(0.45, 1.03)
             else:
               # late stage Kc
-              return random.uniform(0.2, 0.5)
+              return self.rng.uniform(0.2, 0.5)
       
     # Add the following method to get ETc (crop evapotranspiration)
     def _get_etc(self, stage, et0):
         et_c = self.get_kc(stage) * et0
         return et_c
 
+    def calculate_gdd_batch(self, temperature, base_temperature=0):
+        """Vectorized calculate_gdd for an array of daily temperatures."""
+        return np.maximum(0, temperature - base_temperature)
+
+    def get_growth_stage_batch(self, gdd_accumulated):
+        """
+        Growth stage of every field for an array of accumulated GDD.
+
+        Returns:
+        - stage: Numeric growth stage of every field, stage_table.done_code once the crop is complete.
+        """
+        table = self.stage_table
+        return table.codes[np.searchsorted(table.gdd_thresholds, gdd_accumulated, side='right')]
+
+    def calculate_water_needs_batch(self, temperature, stage):
+        """
+        Vectorized calculate_water_needs for arrays of temperatures and numeric stages.
+
+        Returns:
+        - water_needs: Water needs of every field in millimeters.
+        """
+        # Same uniform ranges as calculate_water_needs: [4, 6), [7, 8) and [9, 10)
+        low = np.where(temperature < 15, 4.0, np.where(temperature <= 25, 7.0, 9.0))
+        width = np.where(temperature < 15, 2.0, 1.0)
+        water_needs = (low + width * self.rng.random(np.shape(temperature))) * 1.1
+
+        factor = np.select(
+            [stage == self.stage_table.done_code,
+             (0.5 <= stage) & (stage <= 6.0),
+             (7.0 <= stage) & (stage <= 10.2),
+             (11.0 <= stage) & (stage <= 12.0)],
+            [0.0, 0.5, 1.0, 0.25], default=1.0)
+        return factor * water_needs
+
+    def get_kc_batch(self, stage):
+        """Vectorized get_kc for an array of numeric stages."""
+        early = (0.5 <= stage) & (stage <= 6.0)
+        mid = (7.0 <= stage) & (stage <= 10.2)
+        low = np.where(mid, 0.45, 0.2)
+        high = np.where(early, 0.53, np.where(mid, 1.03, 0.5))
+        return low + (high - low) * self.rng.random(np.shape(stage))
+
+    def _get_etc_batch(self, stage, et0):
+        return self.get_kc_batch(stage) * et0
+
 class CropSim:
-  def __init__(self):
-      pass
+  def __init__(self, disease_table=None):
+      # Disease-specific thresholds, DEFAULT_DISEASES unless a DiseaseTable is given
+      self.disease_table = disease_table if disease_table is not None else DiseaseTable()
 
   def crop_type(self, crop, temperature, ):
     # 5 types 1- -30% less than grass,2- -10% less, 3-Same as grass
@@ -237,27 +478,19 @@ class CropSim:
     - disease_type: The type of disease based on water conditions.
                     Possible values: 'FHB', 'LeafBlotch', 'PowderyMildew', 'Rust', 'NoDisease'.
     """
-    # Define disease-specific thresholds based on the provided table
-    disease_thresholds = {
-        'FHB': {'scarcity': (300, 350), 'excess': (600, 650)},
-        'LeafBlotch': {'scarcity': (250, 300), 'excess': (550, 600)},
-        'PowderyMildew': {'scarcity': (200, 250), 'excess': (500, 550)},
-        'Rust': {'scarcity': (200, 250), 'excess': (450, 500)},
-    }
-
-    # Evaluate water conditions and determine the disease type
-    for disease, thresholds in disease_thresholds.items():
-        scarcity_threshold = thresholds['scarcity']
-        excess_threshold = thresholds['excess']
-
-        if (
-            accumulated_scarcity >= scarcity_threshold[0] and accumulated_scarcity <= scarcity_threshold[1] and
-            accumulated_excess >= excess_threshold[0] and accumulated_excess <= excess_threshold[1]
-        ):
-            return disease
-
-    # If no disease conditions are met, return 'NoDisease'
-    return 'NoDisease'
+    # Evaluate water conditions and determine the disease type, 'NoDisease' if none matches
+    table = self.disease_table
+    return table.name_list[table.classify(accumulated_scarcity, accumulated_excess)]
+
+  def determine_disease_type_batch(self, accumulated_scarcity, accumulated_excess):
+    """
+    Vectorized determine_disease_type for arrays of fields.
+
+    Returns:
+    - disease_code: Integer disease code of every field, 0 for no disease;
+                    disease_table.names[disease_code] gives the disease names.
+    """
+    return self.disease_table.classify_batch(accumulated_scarcity, accumulated_excess)
   
   def disease_control(self, accumulated_scarcity, accumulated_excess, disease):
       """
@@ -273,25 +506,15 @@ class CropSim:
                         For example, 'irrigate', 'reduce_irrigation', 'apply_fungicide', 'no_action', etc.
       """
 
-      # Define disease-specific thresholds based on the provided table
-      disease_thresholds = {
-          'FHB': {'scarcity': (300, 350), 'excess': (600, 650)},
-          'LeafBlotch': {'scarcity': (250, 300), 'excess': (550, 600)},
-          'PowderyMildew': {'scarcity': (200, 250), 'excess': (500, 550)},
-          'Rust': {'scarcity': (200, 250), 'excess': (450, 500)},
-      }
-
-      if disease == 'NoDisease':
+      table = self.disease_table
+      code = table.codes[disease]
+      if code == 0:
         return 'no_action'
 
-      # Get the threshold values for the specified disease
-      scarcity_threshold = disease_thresholds[disease]['scarcity']
-      excess_threshold = disease_thresholds[disease]['excess']
-
       # Evaluate water conditions and recommend disease control measures
-      if accumulated_scarcity < scarcity_threshold[0]:
+      if accumulated_scarcity < table.scarcity_low[code]:
           control_action = 'irrigate'  # Increase irrigation in case of water scarcity
-      elif accumulated_excess > excess_threshold[1]:
+      elif accumulated_excess > table.excess_high[code]:
           control_action = 'reduce_irrigation'  # Reduce irrigation in case of water excess
       else:
           control_action = 'no_action'  # No specific action needed
@@ -311,11 +534,29 @@ class CropSim:
       - True if the crop is considered sick, False otherwise.
       """
 
-      # Use the disease control function to get the recommended control action
-      control_action = self.disease_control(accumulated_scarcity, accumulated_excess, disease)
+      # The crop is sick when disease_control would recommend an action
+      table = self.disease_table
+      return bool(table.is_sick(accumulated_scarcity, accumulated_excess, table.codes[disease]))
 
-      # Check if the recommended action implies that the crop is sick
-      return control_action != 'no_action'
+  def calculate_water_effect_on_yield_batch(self, harvest, excess_water, water_deficit):
+      """Vectorized calculate_water_effect_on_yield for arrays of fields."""
+      excess_effect = 0.1 * (excess_water / 0.1)
+      deficit_effect = 0.1 * (water_deficit / 0.1)
+      return np.maximum(0, harvest - excess_effect - deficit_effect)
+
+  def is_crop_sick_batch(self, accumulated_scarcity, accumulated_excess, disease_code=None):
+      """
+      Vectorized is_crop_sick for arrays of fields.
+
+      Parameters:
+      - disease_code: Disease codes from determine_disease_type_batch, classified here when None.
+
+      Returns:
+      - sick: Boolean array, True where the crop of a field is considered sick.
+      """
+      if disease_code is None:
+          disease_code = self.disease_table.classify_batch(accumulated_scarcity, accumulated_excess)
+      return self.disease_table.is_sick_batch(accumulated_scarcity, accumulated_excess, disease_code)
 
 #   def irrigation_amount(self, water_needs, rain_quantity, evaporation, num_days):
 #     # season days 90 day
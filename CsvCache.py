@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# Bump when the cache layout or the parsed content changes, to force a rebuild
+CACHE_VERSION = 1
+
+
+def cache_directory(csv_path):
+    """Directory holding the binary cache of ``csv_path``, next to the CSV."""
+    return csv_path + ".cache"
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_metadata(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "meta.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_fresh(metadata, csv_path, stat, kind):
+    if metadata is None or metadata.get("version") != CACHE_VERSION or metadata.get("kind") != kind:
+        return False
+    # Size and mtime match: trust the cache without hashing the source again
+    if metadata["source_size"] == stat.st_size and metadata["source_mtime_ns"] == stat.st_mtime_ns:
+        return True
+    return metadata["source_size"] == stat.st_size and metadata["source_sha256"] == _file_sha256(csv_path)
+
+
+def _write_metadata(cache_dir, metadata):
+    meta_path = os.path.join(cache_dir, "meta.json")
+    temp_path = f"{meta_path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(metadata, f)
+    os.replace(temp_path, meta_path)
+
+
+def _write_cache(cache_dir, csv_path, stat, kind, columns):
+    os.makedirs(cache_dir, exist_ok=True)
+    suffix = f".{os.getpid()}.tmp"
+    names = list(columns)
+    for index, name in enumerate(names):
+        file_path = os.path.join(cache_dir, f"column_{index}.npy")
+        with open(file_path + suffix, "wb") as f:
+            np.save(f, np.ascontiguousarray(columns[name]))
+        os.replace(file_path + suffix, file_path)
+
+    # The metadata is written last, so readers never see it ahead of its columns
+    metadata = {
+        "version": CACHE_VERSION,
+        "kind": kind,
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "source_sha256": _file_sha256(csv_path),
+        "columns": names,
+    }
+    _write_metadata(cache_dir, metadata)
+
+
+def load_cached_columns(csv_path, parse, kind="csv"):
+    """
+    Columns of ``csv_path`` as parsed by ``parse``, through a binary cache.
+
+    ``parse(csv_path)`` must return a dict of column name -> 1-D array. Its
+    result is saved as one ``.npy`` file per column plus a ``meta.json`` holding
+    the cache version, ``kind`` and the source file's size, mtime and SHA-256.
+    Later calls open the columns memory-mapped (read-only, zero-copy) and only
+    parse the CSV again when it has changed; a source that was only touched
+    (new mtime, same hash) gets its mtime updated in ``meta.json``, so it is
+    hashed once. If the cache cannot be written, the freshly parsed columns
+    are returned as is.
+    """
+    cache_dir = cache_directory(csv_path)
+    stat = os.stat(csv_path)
+    metadata = _read_metadata(cache_dir)
+    if _is_fresh(metadata, csv_path, stat, kind):
+        try:
+            columns = {name: np.load(os.path.join(cache_dir, f"column_{index}.npy"), mmap_mode="r")
+                       for index, name in enumerate(metadata["columns"])}
+        except (OSError, ValueError):
+            pass
+        else:
+            if metadata["source_mtime_ns"] != stat.st_mtime_ns:
+                # Touched but unchanged: record the new mtime so later loads skip the hash
+                metadata["source_mtime_ns"] = stat.st_mtime_ns
+                try:
+                    _write_metadata(cache_dir, metadata)
+                except OSError:
+                    pass
+            return columns
+
+    columns = parse(csv_path)
+    try:
+        _write_cache(cache_dir, csv_path, stat, kind, columns)
+    except OSError:
+        pass
+    return columns
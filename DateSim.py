@@ -1,87 +1,118 @@
-from prettytable import PrettyTable
 from CropSim import CropSim
 from WeatherSim import WeatherSim
+from Sinks import CsvSink, TableSink
+from Calendar import START_YEAR, get_calendar
 import numpy as np
 
 class DateSIM:
     # Constants representing seasons
     SEASONS = {1: "Spring", 2: "Summer", 3: "Fall", 4: "Winter"}
 
-    def __init__(self, day, month, num_days, daily_irrigation=0):
+    # Columns of the rows yielded by advance
+    COLUMNS = ['Month', 'Day', 'N_days', "Season", "Temperature", "Humidity",
+               "Wind_Speed", "Is_Raining", "Rain_Quantity",
+               "Is_Cloudy", "Sky Clearness", "Evaporation", "Sun Radiation", "QV2M", "PS", "ES", "EA", "Pressure curve", "G", "Gamma"]
+
+    def __init__(self, day, month, num_days, daily_irrigation=0, rng=None, year=START_YEAR):
         # Initialize instances of CropSim and WeatherSim
         self.crop_sim = CropSim()
-        self.weather_sim = WeatherSim()
+        self.weather_sim = WeatherSim(rng=rng)
 
         # Initialize class variables
         self.daily_irrigation = daily_irrigation
-        self.day, self.month, self.num_days = day, month, num_days
-        self.season = self._calculate_season(self.month)
-
-    def _calculate_season(self, month):
-        # Calculate the season based on the month
-        if 3 <= month < 6: return 1  # Spring
-        elif 6 <= month < 8: return 2  # Summer
-        elif 8 <= month < 12: return 3  # Fall
-        else: return 4  # Winter
-
-    def _update_month_and_day(self, is_leap, month, day):
-        # Update the month and day based on leap year conditions
-        if is_leap == 4 and day == 28 and month == 2:
-            month, day = month + 1, 1
-        elif is_leap < 4 and day == 29 and month == 2:
-            is_leap += 1
-            month, day = month + 1, 1
-        elif (is_leap == 4 and day == 31) or (is_leap < 4 and day == 30):
-            month, day = month + 1, 1
-            if month > 12:
-                month = 1
-        else:
-            day = day + 1
-        return month, day, is_leap
-
-    def _update_knuckle(self):
-        # Update knuckle condition based on month
-        if self.month == 8 or self.month > 12:
-            return True
-        return self.day == 31
-
-    def run_date(self):
-        # Initialize PrettyTable for tabular data representation
-        t = PrettyTable(['Month', 'Day', 'N_days', "Season", "Temperature", "Humidity",
-                         "Wind_Speed", "Is_Raining", "Rain_Quantity", 
-                         "Is_Cloudy", "Sky Clearness", "Evaporation", "Sun Radiation", "QV2M", "PS", "ES", "EA", "Pressure curve", "G", "Gamma"])
-
-        is_leap, is_31, season_days = 0, True, 1
-
-        while self.num_days > 0:
-            if self.day <= 31:
-                if self.num_days <= 0:
-                    break
-
-                # Call the weather sim function
-                temperature, humidity, wind_speed, is_raining, rain_quantity, cloud_prob, is_cloudy, evaporation, rn_daily, qv2m, PS, es, ea, delta, G, gamma= \
-                    self.weather_sim.sim_weather(self.month)
-                
-                # Call The crop sim functions
-                crop, water_need = self.crop_sim.crop_type(1, temperature)
-                self.daily_irrigation = 0 #self.crop_sim.irrigation_amount(water_need, rain_quantity, evaporation, season_days)
-
-                self.num_days = self.num_days - 1
-                t.add_row([self.month, self.day, self.num_days, self.SEASONS[self.season], temperature, humidity,
-                           wind_speed, is_raining, rain_quantity, is_cloudy, cloud_prob, evaporation,
-                           rn_daily, qv2m, PS, es, ea, delta, G, gamma])
-
-                self.month, self.day, is_leap = self._update_month_and_day(is_leap, self.month, self.day)
-                is_31 = not is_31 if self.day == 31 else is_31
-
-            self.season = self._calculate_season(self.month)
-            knuckle = self._update_knuckle()
-
-        print(t)
-        data = t.get_csv_string()
-
-        with open('data.csv', 'w') as f:
-            f.write(data)
+        self.calendar = get_calendar()
+        self.num_days = num_days
+        self._set_date(self.calendar.ordinal(year, month, day))
+
+    def _set_date(self, ordinal):
+        # Move to a day of the calendar
+        self.ordinal = ordinal
+        self.year, self.month, self.day, _, self.season = self.calendar.date(ordinal)
+
+    def advance(self, n_days=1):
+        """
+        Simulate the next ``n_days`` days (at most the remaining num_days), one at a time.
+
+        Yields:
+        - row: The day's values, in COLUMNS order.
+        """
+        for _ in range(min(n_days, self.num_days)):
+            # Call the weather sim function
+            temperature, humidity, wind_speed, is_raining, rain_quantity, cloud_prob, is_cloudy, evaporation, rn_daily, qv2m, PS, es, ea, delta, G, gamma= \
+                self.weather_sim.sim_weather(self.month)
+
+            # Call The crop sim functions
+            crop, water_need = self.crop_sim.crop_type(1, temperature)
+            self.daily_irrigation = 0 #self.crop_sim.irrigation_amount(water_need, rain_quantity, evaporation, season_days)
+
+            self.num_days = self.num_days - 1
+            row = [self.month, self.day, self.num_days, self.SEASONS[self.season], temperature, humidity,
+                   wind_speed, is_raining, rain_quantity, is_cloudy, cloud_prob, evaporation,
+                   rn_daily, qv2m, PS, es, ea, delta, G, gamma]
+
+            self._set_date(self.ordinal + 1)
+            yield row
+
+    def get_state(self):
+        # Calendar position, remaining days and weather generator state, as plain JSON values
+        return {"ordinal": self.ordinal, "num_days": self.num_days,
+                "rng": self.weather_sim.rng.bit_generator.state}
+
+    def set_state(self, state):
+        self._set_date(state["ordinal"])
+        self.num_days = state["num_days"]
+        self.weather_sim.rng.bit_generator.state = state["rng"]
+
+    def stream(self, sinks, resume=False):
+        """
+        Simulate the remaining days into Sinks.RowSink objects, in constant memory.
+
+        Parameters:
+        - sinks: Sinks receiving every row; each writes its own chunks.
+        - resume: Continue from the last chunk saved by the resumable sinks, replaying
+          the days of the sinks that are furthest behind.
+
+        Returns:
+        - rows: Number of days simulated by this call.
+        """
+        start = 0
+        if resume:
+            initial_state = self.get_state()
+            saved = [(sink.rows_written, state if state is not None else initial_state)
+                     for sink, state in ((sink, sink.resume()) for sink in sinks) if sink.resumable]
+            if saved:
+                start, state = min(saved, key=lambda item: item[0])
+                self.set_state(state)
+
+        for sink in sinks:
+            if sink.state_source is None:
+                sink.state_source = self.get_state
+
+        row_index = start
+        for row in self.advance(self.num_days):
+            for sink in sinks:
+                # Sinks resumed further ahead already hold this row
+                if row_index >= sink.rows:
+                    sink.add_row(row)
+            row_index += 1
+
+        for sink in sinks:
+            sink.close()
+        return row_index - start
+
+    def run_date(self, print_table=True, csv_path='data.csv'):
+        # Initialize PrettyTable for tabular data representation, imported only for this table
+        from prettytable import PrettyTable
+        t = PrettyTable(self.COLUMNS)
+
+        for row in self.advance(self.num_days):
+            t.add_row(row)
+
+        if print_table:
+            print(t)
+        if csv_path is not None:
+            with open(csv_path, 'w') as f:
+                f.write(t.get_csv_string())
 
         return t
 
@@ -108,7 +139,7 @@ class DateSIM:
 
 def main():
     foo = DateSIM(1, 4, 2192)
-    t = foo.run_date()
+    foo.stream([CsvSink('data.csv', DateSIM.COLUMNS), TableSink(DateSIM.COLUMNS)])
 
 
 if __name__ == "__main__":
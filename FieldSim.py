@@ -1,12 +1,15 @@
-import random
-
 from DateSim import DateSIM
+from Seeding import make_rng
 
 class FieldSim:
 
-  def __init__(self,  day, month, num_days, mode='static'):
+  def __init__(self,  day, month, num_days, mode='static', sink=None, seed=None):
     self.num_days= num_days
-    self.simulation = DateSIM(day, month, num_days, 0)
+    # One generator for the random initial field and the simulated weather
+    self.rng = make_rng(seed)
+    self.simulation = DateSIM(day, month, num_days, 0, rng=self.rng)
+    # Optional object with an add_row method (e.g. a PrettyTable) receiving every simulated day
+    self.sink = sink
     
     if mode == 'static':
       self.InitStatic()
@@ -18,8 +21,8 @@ class FieldSim:
     self.crop_health = 50
 
   def InitRandom(self):
-    self.water_quantity = round(random.uniform(0,5), 2)
-    self.crop_health = random.randint(10, 100)
+    self.water_quantity = round(float(self.rng.uniform(0,5)), 2)
+    self.crop_health = int(self.rng.integers(10, 100, endpoint=True))
 
 
   def validateMove(self):
@@ -34,6 +37,12 @@ class FieldSim:
     
     return outcome
 
+  def advanceDay(self):
+    # Simulate only the day of this move
+    for row in self.simulation.advance(1):
+      if self.sink is not None:
+        self.sink.add_row(row)
+
   def makeMove(self, action):
 
     def checkMove(quantity):
@@ -42,12 +51,12 @@ class FieldSim:
         if quantity == -2:
           self.water_quantity = 0
           self.num_days -= 1
-          self.simulation.run_date()
+          self.advanceDay()
         else:
           new_quantity = self.water_quantity + quantity
           self.water_quantity = new_quantity
           self.num_days -= 1
-          self.simulation.run_date()
+          self.advanceDay()
         
     if action == 'u': #up
       checkMove(1)
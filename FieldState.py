@@ -0,0 +1,92 @@
+import numpy as np
+
+# Dynamic state of a WheatGrowthEnv and its value at the start of an episode.
+# The date is kept as its Calendar ordinal, the other date fields derive from it.
+FIELD_DEFAULTS = {
+    "date_ordinal": 0,
+    "weather_trajectory": -1,
+    "weather_day": 0,
+    "daily_temperature": 0.0,
+    "growth_stage": 0.0,
+    "accumulated_gdd": 0,
+    "gdd_accumulated": 0,
+    "accumulated_excess": 0,
+    "accumulated_scarcity": 0,
+    "soil_moisture_content": 0,
+    "irrigation_amount": 0,
+    "water_needs": 0,
+    "harvest": 100,
+    "etc": 0,
+    "et0": 0.0,
+    "rainfall": 0,
+    "humidity": 0,
+    "is_raining": 0,
+    "sky_clearness": 0,
+    "is_cloudy": 0,
+    "rn_daily": 0,
+    "qv2m": 0,
+    "PS": 0,
+    "wind_speed": 0,
+    "is_crop_sick": 0,
+    "is_success": False,
+}
+FIELD_NAMES = tuple(FIELD_DEFAULTS)
+
+_ndarray = np.ndarray
+
+
+def _own(value):
+    # Fields updated with an ndarray action become (1,) arrays, which later steps
+    # update in place, so a state never shares them with an env
+    return value.copy() if type(value) is _ndarray else value
+
+
+class FieldState:
+    """
+    Snapshot of everything a WheatGrowthEnv step changes: the FIELD_NAMES
+    attributes plus ``rng_state``, the state of the env's random generator
+    (None leaves the generator untouched on ``apply``).
+
+    ``FieldState(**values)`` starts from FIELD_DEFAULTS. ``capture(env)`` and
+    ``apply(env)`` copy the fields out of and into an env, so restoring a
+    state and stepping again reproduces the same days.
+    """
+
+    __slots__ = FIELD_NAMES + ("rng_state",)
+
+    def __init__(self, rng_state=None, **values):
+        for name, default in FIELD_DEFAULTS.items():
+            setattr(self, name, values.pop(name, default))
+        if values:
+            raise TypeError(f"Unknown field state values: {', '.join(values)}")
+        self.rng_state = rng_state
+
+    @classmethod
+    def capture(cls, env):
+        state = cls.__new__(cls)
+        for name in FIELD_NAMES:
+            setattr(state, name, _own(getattr(env, name)))
+        state.rng_state = env.np_random.bit_generator.state
+        return state
+
+    def apply(self, env):
+        for name in FIELD_NAMES:
+            setattr(env, name, _own(getattr(self, name)))
+        env._set_date(self.date_ordinal)
+        if self.rng_state is not None:
+            env.np_random.bit_generator.state = self.rng_state
+
+    def copy(self):
+        state = FieldState.__new__(FieldState)
+        for name in FIELD_NAMES:
+            setattr(state, name, _own(getattr(self, name)))
+        state.rng_state = self.rng_state
+        return state
+
+    def as_dict(self):
+        values = {name: getattr(self, name) for name in FIELD_NAMES}
+        values["rng_state"] = self.rng_state
+        return values
+
+    def __repr__(self):
+        return f"FieldState(date_ordinal={self.date_ordinal}, accumulated_gdd={self.accumulated_gdd}, harvest={self.harvest})"
@@ -0,0 +1,189 @@
+import os
+
+import numpy as np
+
+from CsvCache import load_cached_columns
+from WeatherBank import WeatherBank, season_length
+from WeatherSim import reference_et0
+
+DEFAULT_DAILY_CSV = "POWER_Point_Daily_20150331_20210331_033d36N_006d83E_LST.csv"
+DEFAULT_SICI_CSV = "(SICI)POWER_Point_Daily_20150331_20210331_033d36N_006d83E_LST.csv"
+
+# NET RADIATION OF THE MONTH 22 Year Climatology Average (MJ/m2/day), January to December
+# From : https://power.larc.nasa.gov/data-access-viewer/
+MONTHLY_NET_RADIATION = np.array([13.356, 20.232, 23.688, 28.872, 27.756, 29.88,
+                                  30.564, 30.42, 24.804, 18.432, 14.112, 11.628])
+
+# Value used by POWER for missing source data
+MISSING_VALUE = -999
+
+
+def power_header_lines(path):
+    """Number of lines of the ``-BEGIN HEADER-`` ... ``-END HEADER-`` block of a POWER export (0 without one)."""
+    with open(path) as f:
+        for header_lines, line in enumerate(f, start=1):
+            if line.strip() == "-END HEADER-":
+                return header_lines
+    return 0
+
+
+def read_power_csv(path, use_cache=True):
+    """
+    Read a NASA POWER point export, skipping the ``-BEGIN HEADER-`` block.
+
+    The parsed columns go through the binary cache of CsvCache, so only the
+    first reader of an unchanged export pays for parsing it.
+
+    Returns:
+    - columns: Dict mapping every column name to a float array; missing values are NaN.
+    """
+    if use_cache:
+        return dict(load_cached_columns(path, lambda csv_path: read_power_csv(csv_path, use_cache=False),
+                                        kind="power"))
+
+    # pandas is only needed when the binary cache has to be (re)built
+    import pandas as pd
+    power_df = pd.read_csv(path, skiprows=power_header_lines(path), na_values=[MISSING_VALUE])
+    return {column: power_df[column].to_numpy(dtype=float) for column in power_df.columns}
+
+
+def power_dates(columns):
+    """Dates of a POWER export given as YEAR/DOY or YEAR/MO/DY columns, as datetime64[D]."""
+    years = columns["YEAR"].astype(int) - 1970
+    if "DOY" in columns:
+        return years.astype("datetime64[Y]").astype("datetime64[D]") + (columns["DOY"].astype(int) - 1)
+    months = (years * 12 + columns["MO"].astype(int) - 1).astype("datetime64[M]")
+    return months.astype("datetime64[D]") + (columns["DY"].astype(int) - 1)
+
+
+def daily_net_radiation(dates, sici):
+    """
+    Distribute the monthly net radiation over the days with the Sky Insolation Clearness Index.
+
+    Parameters:
+    - dates: datetime64[D] array of the days.
+    - sici: ALLSKY_KT of every day.
+
+    Returns:
+    - rn_daily: sici * MONTHLY_NET_RADIATION of the month / days in that month (real month lengths).
+    """
+    month_starts = dates.astype("datetime64[M]")
+    days_in_month = ((month_starts + 1).astype("datetime64[D]") - month_starts.astype("datetime64[D]")).astype(int)
+    return sici * MONTHLY_NET_RADIATION[month_starts.astype(int) % 12] / days_in_month
+
+
+class PowerRecord:
+    """
+    Daily POWER weather of one site as date-indexed columns.
+
+    The daily export and the sky insolation clearness index (SICI) export are
+    joined on the date. ET0 and the other sim_weather values are computed for
+    the whole record at once, so ``weather[i]`` holds the
+    WeatherSim.WEATHER_FIELDS values of ``dates[i]``.
+    """
+
+    def __init__(self, daily_csv=DEFAULT_DAILY_CSV, sici_csv=DEFAULT_SICI_CSV, seed=0):
+        daily = read_power_csv(daily_csv)
+        sici = read_power_csv(sici_csv)
+
+        self.dates = power_dates(daily)
+        if np.any(np.diff(self.dates) != np.timedelta64(1, "D")):
+            raise ValueError(f"{daily_csv} must hold consecutive days")
+        self.columns = daily
+        self.columns["ALLSKY_KT"] = self._join(self.dates, power_dates(sici), sici["ALLSKY_KT"])
+
+        month_starts = self.dates.astype("datetime64[M]")
+        self.years = month_starts.astype("datetime64[Y]").astype(int) + 1970
+        self.months = month_starts.astype(int) % 12 + 1
+        self.doys = (self.dates - self.dates.astype("datetime64[Y]")).astype(int) + 1
+        self.columns["rn_daily"] = daily_net_radiation(self.dates, self.columns["ALLSKY_KT"])
+
+        self.weather = self._compute_weather(np.random.default_rng(seed))
+        self.weather.flags.writeable = False
+        self.soil_wetness = self.columns["GWETTOP"]
+
+    @staticmethod
+    def _join(dates, other_dates, values):
+        # Values of other_dates aligned on dates, NaN where a date is missing
+        joined = np.full(len(dates), np.nan)
+        positions = (other_dates - dates[0]).astype(int)
+        inside = (positions >= 0) & (positions < len(dates))
+        joined[positions[inside]] = values[inside]
+        return joined
+
+    def _compute_weather(self, rng):
+        columns = self.columns
+        T, RH, u2 = columns["T2M"], columns["RH2M"], columns["WS2M"]
+        PS, QV2M = columns["PS"], columns["QV2M"]
+        rain, sky_clearness, rn_daily = columns["PRECTOTCORR"], columns["ALLSKY_KT"], columns["rn_daily"]
+
+        # Same ET0 kernel as WeatherSim, over the whole record at once
+        G = rng.uniform(0.1, 0.3, len(T)) * rn_daily
+        et0, es, ea, delta, gamma = reference_et0(T, RH, u2, PS, QV2M, rn_daily, G)
+
+        return np.stack([T, RH, u2, rain > 0, rain, sky_clearness, sky_clearness < 0.5, et0,
+                         rn_daily, QV2M, PS, es, ea, delta, G, gamma], axis=-1).astype(float)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def index(self, year, doy):
+        """Position of (year, day-of-year) in the record."""
+        date = np.datetime64(f"{year:04d}-01-01") + (doy - 1)
+        position = int((date - self.dates[0]).astype(int))
+        if not 0 <= position < len(self.dates):
+            raise ValueError(f"No data available for year {year} day {doy}")
+        return position
+
+    def seasons(self, start_month, start_day, end_month, end_day):
+        """
+        Every complete season of the record between the start and end dates.
+
+        Returns:
+        - bank: WeatherBank with one trajectory per season, in chronological order,
+          and the daily GWETTOP as its soil wetness.
+        """
+        season_days = season_length(start_month, start_day, end_month, end_day)
+        first_year, last_year = self.years[0], self.years[-1]
+        starts = np.array([f"{year:04d}-{start_month:02d}-{start_day:02d}"
+                           for year in range(first_year, last_year + 1)], dtype="datetime64[D]")
+        offsets = (starts - self.dates[0]).astype(int)
+        offsets = offsets[(offsets >= 0) & (offsets + season_days <= len(self.dates))]
+        if len(offsets) == 0:
+            raise ValueError(f"No complete season from {start_month}/{start_day} "
+                             f"to {end_month}/{end_day} in the record")
+
+        days = offsets[:, None] + np.arange(season_days)
+        return WeatherBank(self.weather[days], key=(start_month, start_day, end_month, end_day),
+                           soil_wetness=self.soil_wetness[days])
+
+
+_records = {}
+
+
+def get_power_record(daily_csv=DEFAULT_DAILY_CSV, sici_csv=DEFAULT_SICI_CSV):
+    """Return the shared PowerRecord of the two exports, parsing them on first use."""
+    key = (os.path.abspath(daily_csv), os.path.abspath(sici_csv))
+    record = _records.get(key)
+    if record is None:
+        record = PowerRecord(daily_csv, sici_csv)
+        _records[key] = record
+    return record
+
+
+class HistoricalWeatherSim:
+    """WeatherSim backend serving the recorded weather of a POWER export by date."""
+
+    def __init__(self, daily_csv=DEFAULT_DAILY_CSV, sici_csv=DEFAULT_SICI_CSV):
+        self.record = get_power_record(daily_csv, sici_csv)
+
+    def sim_weather(self, year, doy):
+        # Same values, in the same order, as WeatherSim.sim_weather
+        return tuple(self.record.weather[self.record.index(year, doy)].tolist())
+
+    def get_surface_soil_wetness(self, year, doy):
+        return float(self.record.soil_wetness[self.record.index(year, doy)])
+
+    def seasons(self, start_month, start_day, end_month, end_day):
+        """Recorded seasons as a WeatherBank, ready for WheatGrowthEnv(weather_source=...)."""
+        return self.record.seasons(start_month, start_day, end_month, end_day)
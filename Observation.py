@@ -0,0 +1,104 @@
+from operator import attrgetter
+
+import numpy as np
+from gym import spaces
+
+# Fields of an observation, in order. They are the keys of the dict observation
+# and the columns of the flat float32 observation (booleans as 0/1, stages as
+# their numeric code).
+OBSERVATION_KEYS = (
+    "current_day", "current_month", "current_month_day", "current_year",
+    "daily_temperature", "growth_stage", "accumulated_gdd", "accumulated_scarcity",
+    "accumulated_excess", "soil_moisture_content", "water_needs", "etc", "rainfall",
+    "harvest", "humidity", "is_raining", "sky_clearness", "is_cloudy", "rn_daily",
+    "qv2m", "PS", "wind_speed", "is_crop_sick",
+)
+
+# Column of every field in a flat observation
+OBSERVATION_INDEX = {key: index for index, key in enumerate(OBSERVATION_KEYS)}
+
+# (low, high) of every field over the values the simulators actually produce. The
+# weather is drawn from unclipped normal distributions and the soil balance can go
+# negative, so those fields have no bound; stage codes come from a configurable table.
+OBSERVATION_BOUNDS = {
+    "current_day": (1, 366),
+    "current_month": (1, 12),
+    "current_month_day": (1, 31),
+    "current_year": (0, 2999),
+    "daily_temperature": (-np.inf, np.inf),
+    "growth_stage": (0, np.inf),
+    "accumulated_gdd": (0, np.inf),
+    "accumulated_scarcity": (0, np.inf),
+    "accumulated_excess": (0, np.inf),
+    "soil_moisture_content": (-np.inf, np.inf),
+    "water_needs": (-np.inf, np.inf),
+    "etc": (-np.inf, np.inf),
+    "rainfall": (0, np.inf),
+    "harvest": (0, 100),
+    "humidity": (-np.inf, np.inf),
+    "is_raining": (0, 1),
+    "sky_clearness": (-np.inf, np.inf),
+    "is_cloudy": (0, 1),
+    "rn_daily": (-np.inf, np.inf),
+    "qv2m": (-np.inf, np.inf),
+    "PS": (-np.inf, np.inf),
+    "wind_speed": (-np.inf, np.inf),
+    "is_crop_sick": (0, 1),
+}
+
+# Integer fields, spaces.Discrete in the dict observation space
+DISCRETE_KEYS = ("current_day", "current_month", "current_month_day", "current_year",
+                 "is_raining", "is_cloudy", "is_crop_sick")
+
+OBSERVATION_MODES = ("dict", "flat")
+
+_get_fields = attrgetter(*OBSERVATION_KEYS)
+_ndarray = np.ndarray
+
+
+def check_observation_mode(observation_mode):
+    if observation_mode not in OBSERVATION_MODES:
+        raise ValueError(f"observation_mode must be one of {OBSERVATION_MODES}, got {observation_mode!r}")
+    return observation_mode
+
+
+def dict_observation_space():
+    """Dict space of the dict observations, with the OBSERVATION_BOUNDS of every field."""
+    fields = {}
+    for key in OBSERVATION_KEYS:
+        low, high = OBSERVATION_BOUNDS[key]
+        if key in DISCRETE_KEYS:
+            fields[key] = spaces.Discrete(high - low + 1, start=low)
+        else:
+            fields[key] = spaces.Box(low=low, high=high, shape=(1,), dtype=np.float32)
+    return spaces.Dict(fields)
+
+
+def flat_observation_space(n_envs=None):
+    """
+    Box matching the flat observations: shape (F,) for a single field, (n_envs, F) for a batch.
+    """
+    low = np.array([OBSERVATION_BOUNDS[key][0] for key in OBSERVATION_KEYS], dtype=np.float32)
+    high = np.array([OBSERVATION_BOUNDS[key][1] for key in OBSERVATION_KEYS], dtype=np.float32)
+    if n_envs is not None:
+        low, high = np.tile(low, (n_envs, 1)), np.tile(high, (n_envs, 1))
+    return spaces.Box(low=low, high=high, dtype=np.float32)
+
+
+def write_flat_observation(env, out):
+    """
+    Write the observation fields of ``env`` into the float32 array ``out``.
+
+    ``out`` has shape (F,) for a single environment, whose fields are scalars or
+    one-element arrays, and is returned as is. For a batched environment, whose
+    fields are length n_envs arrays, ``out`` is field-major with shape
+    (F, n_envs) so that every field is one contiguous write, and the returned
+    observation is its (n_envs, F) transposed view.
+    """
+    values = _get_fields(env)
+    if out.ndim == 1:
+        out[:] = [value.item() if type(value) is _ndarray else value for value in values]
+        return out
+    for index, value in enumerate(values):
+        out[index] = value
+    return out.T
@@ -0,0 +1,113 @@
+"""
+Feature table and monthly statistics of a NASA POWER site, as in the notebook.
+
+    features, stats = prepare_power_dataset(daily_csv, sici_csv, stats_csv="meteorological_data_statistics.csv")
+
+``stats`` has the layout of meteorological_data_statistics.csv, read by
+Climatology for WeatherSim and SoilSim.
+"""
+import csv
+
+import numpy as np
+
+from HistoricalWeather import PowerRecord, daily_net_radiation, power_dates, read_power_csv
+from WeatherSim import reference_et0
+
+# Variables summarized per month, in the column order of meteorological_data_statistics.csv
+STATS_VARIABLES = ("T2M", "QV2M", "WS2M", "RH2M", "PRECTOTCORR", "PS", "rn_daily", "ALLSKY_KT", "GWETTOP")
+STATISTICS = ("Mean", "StdDev", "IQR")
+
+
+def stats_columns(variables=STATS_VARIABLES):
+    """Header of a statistics CSV: Month, then <variable>_Mean, _StdDev and _IQR per variable."""
+    return ["Month"] + [f"{variable}_{statistic}" for variable in variables for statistic in STATISTICS]
+
+
+def monthly_statistics(months, columns, variables=STATS_VARIABLES):
+    """
+    Mean, standard deviation (ddof=1) and interquartile range of every variable per month.
+
+    Missing values (NaN) are skipped, as pandas does.
+
+    Parameters:
+    - months: Month (1-12) of every row.
+    - columns: Dict of variable name -> values of every row.
+
+    Returns:
+    - stats: Dict of stats_columns(variables) -> one value per month present in ``months``.
+    """
+    months = np.asarray(months).astype(int)
+    # Sort the rows by month once, then summarize each month's block for all variables at once
+    order = np.argsort(months, kind="stable")
+    values = np.column_stack([np.asarray(columns[variable], dtype=float)[order] for variable in variables])
+    sorted_months = months[order]
+    present = np.unique(sorted_months)
+    bounds = np.searchsorted(sorted_months, np.append(present, 13))
+
+    stats = {column: np.empty(len(present)) for column in stats_columns(variables)}
+    stats["Month"] = present.astype(float)
+    for row, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+        block = values[start:end]
+        q1, q3 = np.nanpercentile(block, [25, 75], axis=0)
+        for variable, mean, std_dev, iqr in zip(variables, np.nanmean(block, axis=0),
+                                                np.nanstd(block, axis=0, ddof=1), q3 - q1):
+            stats[f"{variable}_Mean"][row] = mean
+            stats[f"{variable}_StdDev"][row] = std_dev
+            stats[f"{variable}_IQR"][row] = iqr
+    return stats
+
+
+def write_stats_csv(stats, path):
+    """Write statistics laid out like meteorological_data_statistics.csv."""
+    header = list(stats)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for row in zip(*(stats[column].tolist() for column in header)):
+            writer.writerow([int(row[0])] + list(row[1:]))
+
+
+def prepare_power_dataset(daily_csv, sici_csv, stats_csv=None, seed=0, use_cache=True):
+    """
+    Build the notebook's feature table and monthly statistics from two POWER exports.
+
+    The SICI export is joined on the date, which comes from YEAR/DOY or
+    YEAR/MO/DY with real leap years. The net radiation, soil heat flux and ET0
+    chain are computed column-wise, with the same formulas as PowerRecord.
+
+    Parameters:
+    - daily_csv: POWER daily export (T2M, QV2M, RH2M, PRECTOTCORR, WS2M, PS, GWETTOP, ...).
+    - sici_csv: POWER export of the daily ALLSKY_KT.
+    - stats_csv: Optional path to write the monthly statistics to.
+    - seed: Seed of the random soil heat flux fraction.
+
+    Returns:
+    - features: Dict of column -> array, one row per day: the daily export's
+      columns plus MO, DY, ALLSKY_KT, Days_in_Month, rn_daily, ES, EA, SC, S_H,
+      S_HT, soil_heat_flux, psychrometric_constant and ET0.
+    - stats: Dict of stats_columns() -> one value per month.
+    """
+    features = read_power_csv(daily_csv, use_cache=use_cache)
+    sici = read_power_csv(sici_csv, use_cache=use_cache)
+    dates = power_dates(features)
+
+    month_starts = dates.astype("datetime64[M]")
+    features["MO"] = (month_starts.astype(int) % 12 + 1).astype(float)
+    features["DY"] = ((dates - month_starts).astype(int) + 1).astype(float)
+    features["ALLSKY_KT"] = PowerRecord._join(dates, power_dates(sici), sici["ALLSKY_KT"])
+    features["Days_in_Month"] = ((month_starts + 1).astype("datetime64[D]")
+                                 - month_starts.astype("datetime64[D]")).astype(float)
+    features["rn_daily"] = daily_net_radiation(dates, features["ALLSKY_KT"])
+
+    T, QV2M = features["T2M"], features["QV2M"]
+    features["S_H"] = np.divide(QV2M, 1 - QV2M, out=QV2M.copy(), where=QV2M != 1)
+    features["S_HT"] = 1005 + (features["S_H"] * 461 / T)
+    features["soil_heat_flux"] = np.random.default_rng(seed).uniform(0.1, 0.3, len(T)) * features["rn_daily"]
+    (features["ET0"], features["ES"], features["EA"], features["SC"],
+     features["psychrometric_constant"]) = reference_et0(T, features["RH2M"], features["WS2M"], features["PS"],
+                                                         QV2M, features["rn_daily"], features["soil_heat_flux"])
+
+    stats = monthly_statistics(features["MO"], features)
+    if stats_csv is not None:
+        write_stats_csv(stats, stats_csv)
+    return features, stats
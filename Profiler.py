@@ -0,0 +1,63 @@
+import json
+import time
+from collections import defaultdict
+
+
+class PhaseProfiler:
+    """
+    Cumulative wall time and call count per named phase, plus event counters.
+
+    Callers time a phase with ``start = profiler.lap(phase, start)``, where
+    ``start`` is the previous ``time.perf_counter()`` value, so consecutive
+    phases cost one clock read each. When ``dump_path`` is given, ``tick``
+    appends a snapshot as one JSON line to it every ``dump_every`` ticks.
+    """
+
+    def __init__(self, dump_path=None, dump_every=1000):
+        self.dump_path = dump_path
+        self.dump_every = dump_every
+        self.reset()
+
+    def reset(self):
+        self.times = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.started = time.time()
+        self._ticks = 0
+
+    def lap(self, phase, start):
+        now = time.perf_counter()
+        self.times[phase] += now - start
+        self.calls[phase] += 1
+        return now
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def tick(self):
+        """Mark the end of a step, dumping a snapshot every ``dump_every`` ticks."""
+        self._ticks += 1
+        if self.dump_path is not None and self._ticks % self.dump_every == 0:
+            self.dump()
+
+    def snapshot(self):
+        """
+        Current totals.
+
+        Returns:
+        - snapshot: Dict with, for every phase, its call count, total seconds and
+          mean microseconds per call, and the value of every counter.
+        """
+        return {
+            "time": time.time(),
+            "elapsed_s": time.time() - self.started,
+            "phases": {phase: {"calls": self.calls[phase],
+                               "total_s": total,
+                               "mean_us": total / self.calls[phase] * 1e6}
+                       for phase, total in self.times.items()},
+            "counters": dict(self.counters),
+        }
+
+    def dump(self, path=None):
+        with open(path or self.dump_path, "a") as f:
+            f.write(json.dumps(self.snapshot()) + "\n")
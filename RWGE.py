@@ -1,87 +1,70 @@
 import gym
-import gym.utils.seeding
 from gym import spaces
 import numpy as np
-from IPython.display import clear_output, display
+import copy
 import time
 from WeatherSim import WeatherSim
 from CropSim import CropSim, WheatGrowthModel
-from DateSim import DateSIM
+from Calendar import START_YEAR, get_calendar
 from SoilSim import SoilSim
-from RWGE_renderer import WheatGrowthRenderer
-import torch
+from Seeding import seed_sequence, make_rng
+from Profiler import PhaseProfiler
+from FieldState import FieldState
+from Observation import (OBSERVATION_KEYS, check_observation_mode, dict_observation_space,
+                         flat_observation_space, write_flat_observation)
 
 class WheatGrowthEnv(gym.Env):
-  def __init__(self, start_month, start_day, end_month, end_day, render_mode='human'):
+  def __init__(self, start_month, start_day, end_month, end_day, render_mode='human', weather_source=None, seed=None,
+               observation_mode='dict', render_every=1, frame_skip=1):
     super(WheatGrowthEnv).__init__()
-    # self.render_mode = render_mode
-    # self.renderer = WheatGrowthRenderer(self)
+    self.render_mode = render_mode
+    # In rgb_array mode step draws a frame every render_every steps
+    if render_every < 1:
+        raise ValueError(f"render_every must be at least 1, got {render_every}")
+    self.render_every = render_every
+    # Days simulated by a step without n_days, e.g. 7 for weekly irrigation decisions
+    if frame_skip < 1:
+        raise ValueError(f"frame_skip must be at least 1, got {frame_skip}")
+    self.frame_skip = frame_skip
     
     # Initialize instances of CropSim and WeatherSim
     self.crop_sim = CropSim()
     self.wheat_growth = WheatGrowthModel()
     self.weather_sim = WeatherSim()
-    self.date_sim = DateSIM(start_day, start_month, 0)
+    self.calendar = get_calendar()
     self.soil_sim = SoilSim()
 
+    # Optional WeatherBank replayed instead of sampling the weather every day
+    self.weather_source = weather_source
+    # SeasonSchedule of the replayed trajectory, see _season_schedule
+    self._schedule = None
+    self._schedule_trajectory = None
+
+    # Optional PhaseProfiler timing the phases of step, see enable_profiling
+    self.profiler = None
+
+    # Offscreen WheatGrowthRenderer, created on first use by the renderer property,
+    # and the optional RWGE_recorder.EpisodeRecorder of its frames
+    self._renderer = None
+    self.recorder = None
+
     # Define action space (irrigation amount)
     self.action_space = spaces.Box(low=0, high=11, shape=(1,), dtype=float)
 
     # Define observation space
-    self.observation_space = spaces.Dict({
-            "current_day": spaces.Discrete(365),
-            "current_month": spaces.Discrete(12),
-            "current_month_day": spaces.Discrete(31),
-            "current_year": spaces.Discrete(3000),
-            "daily_temperature": spaces.Box(low=0, high=50, shape=(1,), dtype=np.float32),
-            "growth_stage": spaces.Box(low=0, high=13, shape=(1,), dtype=np.float32),
-            "accumulated_gdd": spaces.Box(low=0, high=3000, shape=(1,), dtype=np.float32),
-            "accumulated_scarcity": spaces.Box(low=0, high=1000, shape=(1,), dtype=np.float32),
-            "accumulated_excess": spaces.Box(low=0, high=1000, shape=(1,), dtype=np.float32),
-            "soil_moisture_content": spaces.Box(low=0, high=100, shape=(1,), dtype=np.float32),
-            "water_needs": spaces.Box(low=0, high=11, shape=(1,), dtype=np.float32),
-            "etc": spaces.Box(low=0, high=2, shape=(1,), dtype=np.float32),
-            "rainfall": spaces.Box(low=0, high=11, shape=(1,), dtype=np.float32),
-            "harvest": spaces.Box(low=0, high=100, shape=(1,), dtype=np.float32),
-            "humidity": spaces.Box(low=0, high=100, shape=(1,), dtype=np.float32),
-            "is_raining": spaces.Discrete(2),
-            "sky_clearness": spaces.Box(low=0, high=1, shape=(1,), dtype=np.float32),
-            "is_cloudy": spaces.Discrete(2),
-            "rn_daily": spaces.Box(low=0, high=1, shape=(1,), dtype=np.float32),
-            "qv2m": spaces.Box(low=0, high=11, shape=(1,), dtype=np.float32),
-            "PS": spaces.Box(low=0, high=11, shape=(1,), dtype=np.float32),
-            "wind_speed": spaces.Box(low=0, high=11, shape=(1,), dtype=np.float32),
-            "is_crop_sick": spaces.Discrete(2),
-
-        })
+    self.observation_space = dict_observation_space()
+
+    # In flat mode observations are one float32 array, columns in Observation.OBSERVATION_KEYS
+    # order. The same array is returned and overwritten by every step.
+    self.observation_mode = check_observation_mode(observation_mode)
+    if observation_mode == 'flat':
+        self.observation_space = flat_observation_space()
+        self._flat_observation = np.zeros(len(OBSERVATION_KEYS), dtype=np.float32)
     
-    # Initialize state variables
-    self.current_day = 0
-    self.current_month_day = start_day
-    self.current_month = start_month
-    self.current_year = 2015  # You can set the initial year as needed
-    self.daily_temperature = 0.0
-    self.growth_stage = 0.0
-    self.accumulated_gdd = 0
-    self.accumulated_excess = 0
-    self.accumulated_scarcity = 0
-    self.soil_moisture_content = 0
-    self.irrigation_amount = 0
-    self.water_needs = 0
-    self.harvest = 100
-    self.etc = 0
-    self.et0 = 0.0
-    self.rainfall = 0
-    self.humidity = 0
-    self.is_raining = 0
-    self.sky_clearness = 0
-    self.is_cloudy = 0
-    self.rn_daily = 0
-    self.qv2m = 0
-    self.PS = 0
-    self.wind_speed = 0
-    self.is_crop_sick = 0
-    self.is_success = False
+    # Initialize state variables, listed in FieldState.FIELD_DEFAULTS
+    # current_day is the day of the year and current_month_day the day of the month
+    self.start_ordinal = self.calendar.ordinal(START_YEAR, start_month, start_day)
+    FieldState(date_ordinal=self.start_ordinal).apply(self)
 
     # Start and end dates
     self.start_month = start_month
@@ -89,53 +72,135 @@ class WheatGrowthEnv(gym.Env):
     self.end_month = end_month
     self.end_day = end_day
 
+    self.seed(seed)
+
   def seed(self, seed=None):
-      self.np_random, seed = gym.utils.seeding.np_random(seed)
-      return [seed]
+      # One generator per environment, drawn from by every simulator it drives.
+      # seed may be an int or a SeedSequence from Seeding.spawn_seeds
+      seed = seed_sequence(seed)
+      self.np_random = make_rng(seed)
+      self.weather_sim.rng = self.np_random
+      self.soil_sim.rng = self.np_random
+      self.wheat_growth.rng = self.np_random
+      return [seed.entropy]
+
+  @property
+  def renderer(self):
+    # pygame is only imported once something is rendered
+    if self._renderer is None:
+        from RWGE_renderer import WheatGrowthRenderer
+        self._renderer = WheatGrowthRenderer(self, mode='rgb_array', render_every=self.render_every)
+    return self._renderer
+
+  def enable_profiling(self, dump_path=None, dump_every=1000):
+    """
+    Time every phase of step and count steps, resets, episodes and render calls.
+
+    Parameters:
+    - dump_path: Optional JSON-lines file receiving a snapshot every dump_every steps.
+
+    Returns:
+    - profiler: The PhaseProfiler; profiler.snapshot() gives the current totals.
+    """
+    self.profiler = PhaseProfiler(dump_path, dump_every)
+    return self.profiler
+
+  def disable_profiling(self):
+    self.profiler = None
+
+  def reset(self, trajectory=None, seed=None):
+    if seed is not None:
+        self.seed(seed)
+    if self.profiler is not None:
+        self.profiler.count("resets")
+    if self.recorder is not None:
+        self.recorder.new_episode()
+
+    # Pick the weather trajectory to replay: the requested one or the next in the bank
+    if self.weather_source is not None:
+        if trajectory is None:
+            trajectory = (self.weather_trajectory + 1) % self.weather_source.n_trajectories
+    else:
+        trajectory = self.weather_trajectory
 
-  def reset(self):
-    
     # Initialize state variables
-    self.current_day = 0
-    self.is_leap = 0
-    self.current_month_day = self.start_day
-    self.current_month = self.start_month
-    self.current_year = 2015  # You can set the initial year as needed
-    self.daily_temperature = 0.0
-    self.growth_stage = 0.0
-    self.accumulated_gdd = 0
-    self.accumulated_excess = 0
-    self.accumulated_scarcity = 0
-    self.soil_moisture_content = 0
-    self.irrigation_amount = 0
-    self.water_needs = 0
-    self.harvest = 100
-    self.etc = 0
-    self.rainfall = 0
-    self.humidity = 0
-    self.is_raining = 0
-    self.sky_clearness = 0
-    self.is_cloudy = 0
-    self.rn_daily = 0
-    self.qv2m = 0
-    self.PS = 0
-    self.wind_speed = 0
-    self.is_crop_sick = 0
-    self.is_success = False
-    self.current_day = 1
+    FieldState(date_ordinal=self.start_ordinal, weather_trajectory=trajectory).apply(self)
     
     # Return initial observation
     return self._get_observation()
   
-  def _simulate_growth(self, action):
-    # Get Weather related values
-    self.daily_temperature,self.humidity, self.wind_speed, self.is_raining, self.rainfall, self.sky_clearness, self.is_cloudy, self.et0, self.rn_daily, self.qv2m, self.PS, es, ea, delta, G,gamma  = self.weather_sim.sim_weather(self.current_month)
+  def get_state(self):
+    """
+    Snapshot of the field, see FieldState.
+
+    Returns:
+    - state: FieldState with every dynamic value and the random generator state.
+    """
+    return FieldState.capture(self)
+
+  def set_state(self, state):
+    # Continue from a FieldState of this env or of one with the same season window
+    state.apply(self)
+    return self._get_observation()
+
+  def clone(self, state=None):
+    """
+    Independent copy of the env at its current state, or at ``state``.
+
+    The copy shares the read-only parts (calendar, climatology, weather bank,
+    growth stage table) and gets its own random generator, so stepping it leaves
+    this env untouched. It has no renderer, recorder or profiler.
+    """
+    clone = copy.copy(self)
+    clone._renderer = None
+    clone.recorder = None
+    clone.profiler = None
+    if self.observation_mode == 'flat':
+        clone._flat_observation = np.zeros_like(self._flat_observation)
+    clone.np_random = np.random.Generator(type(self.np_random.bit_generator)())
+    for name in ('weather_sim', 'soil_sim', 'wheat_growth'):
+        simulator = copy.copy(getattr(self, name))
+        simulator.rng = clone.np_random
+        setattr(clone, name, simulator)
+    (state if state is not None else self.get_state()).apply(clone)
+    return clone
+
+  def _set_date(self, ordinal):
+    # Move to a day of the calendar
+    self.date_ordinal = ordinal
+    (self.current_year, self.current_month, self.current_month_day,
+     self.current_day, self.season) = self.calendar.date(ordinal)
+
+  def _simulate_growth(self, action, weather=None):
+    # weather: Optional sim_weather tuple drawn in advance for the day
+    profiler = self.profiler
+    if profiler is not None:
+        start = time.perf_counter()
+
+    # Get Weather related values, replayed from the weather bank while the season lasts
+    replay_day = self.weather_day
+    self.weather_day += 1
+    if self.weather_source is not None and replay_day < self.weather_source.season_days:
+        weather = self.weather_source.day(self.weather_trajectory, replay_day)
+    else:
+        replay_day = None
+        if weather is None:
+            weather = self.weather_sim.sim_weather(self.current_month)
+    self.daily_temperature,self.humidity, self.wind_speed, self.is_raining, self.rainfall, self.sky_clearness, self.is_cloudy, self.et0, self.rn_daily, self.qv2m, self.PS, es, ea, delta, G,gamma  = weather
+    if profiler is not None:
+        start = profiler.lap("weather", start)
+
     # Get Crop Related Values
     daily_gdd = self.wheat_growth.calculate_gdd(self.daily_temperature)
     self.accumulated_gdd += daily_gdd
     
     
-    stage_info, description, gdd_required, self.gdd_accumulated = self.wheat_growth.get_growth_stage_info(self.accumulated_gdd)
+    if replay_day is not None:
+        # Replayed temperatures are known for the whole season, look the stage up by day
+        stage_info, description, gdd_required = self._season_schedule().stage_info(replay_day)
+        self.gdd_accumulated = self.wheat_growth.gdd_accumulated
+    else:
+        stage_info, description, gdd_required, self.gdd_accumulated = self.wheat_growth.get_growth_stage_info(self.accumulated_gdd)
     self.growth_stage = stage_info
     # print("--------------------Growth STAGE -----------------", self.growth_stage)
     self.etc = self.wheat_growth._get_etc(self.growth_stage, self.et0)
@@ -143,9 +208,14 @@ class WheatGrowthEnv(gym.Env):
     self.water_needs = self.wheat_growth.calculate_water_needs(self.daily_temperature, self.growth_stage)
     
     self.water_needs += self.etc
-    
+    if profiler is not None:
+        start = profiler.lap("crop", start)
+
     # Get soil Related values
-    self.soil_moisture_content += self.soil_sim.get_surface_soil_wetness(self.current_month)
+    if replay_day is not None and self.weather_source.soil_wetness is not None:
+        self.soil_moisture_content += float(self.weather_source.soil_wetness[self.weather_trajectory, replay_day])
+    else:
+        self.soil_moisture_content += self.soil_sim.get_surface_soil_wetness(self.current_month)
 
     # add Action
     self.soil_moisture_content += action
@@ -159,9 +229,13 @@ class WheatGrowthEnv(gym.Env):
 
     self.accumulated_scarcity += water_deficit * -1
     self.accumulated_excess += water_excess
+    if profiler is not None:
+        start = profiler.lap("soil", start)
 
     # Check water usage effect on harvest and update it
     self.harvest = self.crop_sim.calculate_water_effect_on_yield(self.harvest, self.accumulated_excess, self.accumulated_scarcity)
+    if profiler is not None:
+        start = profiler.lap("yield", start)
 
     # Check diseases
     disease_type = self.crop_sim.determine_disease_type(self.accumulated_scarcity, self.accumulated_excess)
@@ -170,95 +244,112 @@ class WheatGrowthEnv(gym.Env):
       self.is_crop_sick = 1
     else:
       self.is_crop_sick = 0
-    
+    if profiler is not None:
+        start = profiler.lap("disease", start)
+
     # update date
-    self.current_month, self.current_day, self.is_leap = self.date_sim._update_month_and_day(self.is_leap, self.current_month, self.current_day)
+    self._set_date(self.date_ordinal + 1)
+    if profiler is not None:
+        profiler.lap("date", start)
     
 
-  def step(self, action):
-    done = False
-    # Call simulate_growth Function
-    self._simulate_growth(action)
+  def _season_schedule(self):
+    # SeasonSchedule of the replayed weather trajectory, computed once per trajectory
+    if self._schedule_trajectory != self.weather_trajectory:
+        temperature = WeatherSim.WEATHER_FIELDS.index('temperature')
+        self._schedule = self.wheat_growth.precompute_season(
+            self.weather_source.trajectories[self.weather_trajectory, :, temperature])
+        self._schedule_trajectory = self.weather_trajectory
+    return self._schedule
+
+  def _draw_weather(self, n_days):
+    # sim_weather tuples of the next n_days, sampled in one batch, None for the
+    # days replayed from the weather bank
+    replayed = 0
+    if self.weather_source is not None:
+        replayed = min(n_days, max(0, self.weather_source.season_days - self.weather_day))
+    weather = [None] * replayed
+    if replayed < n_days:
+        months = self.calendar.months[self.date_ordinal + replayed:self.date_ordinal + n_days]
+        sampled = self.weather_sim.sim_weather_batch(months)
+        weather += np.stack([sampled[field] for field in WeatherSim.WEATHER_FIELDS], axis=-1).astype(float).tolist()
+    return weather
+
+  def step(self, action, n_days=None):
+    # The action is applied for n_days days (frame_skip by default), stopping early
+    # on termination, and the reward is the sum of the daily rewards
+    if n_days is None:
+        n_days = self.frame_skip
+    elif n_days < 1:
+        raise ValueError(f"n_days must be at least 1, got {n_days}")
+    weather = self._draw_weather(n_days) if n_days > 1 else None
+    profiler = self.profiler
+    total_reward = None
+    for day in range(n_days):
+        done = False
+        # Call simulate_growth Function
+        self._simulate_growth(action, None if weather is None else weather[day])
+        if profiler is not None:
+            start = time.perf_counter()
+        # Action represents the irrigation amount
+        reward = self._calculate_reward(action, self.water_needs, self.soil_moisture_content)
+        total_reward = reward if total_reward is None else total_reward + reward
+        if profiler is not None:
+            start = profiler.lap("reward", start)
+        #done = self.growth_stage >= 12 or self.harvest < 30
+        crop_done = self.growth_stage == self.wheat_growth.stage_table.done_code
+        # Additional check to prevent premature episode termination
+        if crop_done or self.growth_stage >= 12 and self.harvest >= 30:
+            done = True  # End episode only if both conditions are met
+        elif crop_done or self.growth_stage >= 12:
+            # Adjust harvest threshold to prevent premature termination
+            done = self.harvest < 10  # Ensure harvest doesn't fall too low before episode ends
+        elif self.harvest < 30:
+            # Adjust growth stage threshold to prevent premature termination
+            done = self.growth_stage >= 3  # Allow some progress before ending due to low harvest
+            #done = self.harvest < 10  # Ensure harvest doesn't fall too low before episode ends
+        if profiler is not None:
+            profiler.lap("termination", start)
+        if done:
+            break
+
+    if profiler is not None:
+        start = time.perf_counter()
     # Call render with the action
     if self.render_mode == 'rgb_array':
         self.renderer.render(action)
+        if profiler is not None:
+            profiler.count("render_calls")
+            start = profiler.lap("render", start)
     # Return observation, reward, done, and info
     observation = self._get_observation()
-    # Action represents the irrigation amount
-    reward = self._calculate_reward(action, self.water_needs, self.soil_moisture_content)
-    #done = self.growth_stage >= 12 or self.harvest < 30
-    # Additional check to prevent premature episode termination
-    if isinstance(self.growth_stage, str) and self.growth_stage == "Done" or self.growth_stage >= 12 and self.harvest >= 30:
-        done = True  # End episode only if both conditions are met
-    elif isinstance(self.growth_stage, str) and self.growth_stage == "Done" or self.growth_stage >= 12:
-        # Adjust harvest threshold to prevent premature termination
-        done = self.harvest < 10  # Ensure harvest doesn't fall too low before episode ends
-    elif self.harvest < 30:
-        # Adjust growth stage threshold to prevent premature termination
-        done = self.growth_stage >= 3  # Allow some progress before ending due to low harvest
-        #done = self.harvest < 10  # Ensure harvest doesn't fall too low before episode ends
-
+    if profiler is not None:
+        profiler.lap("observation", start)
 
     if done:
-         if isinstance(self.growth_stage, str) and self.growth_stage == "Done" or self.growth_stage >= 12 and self.harvest > 30 and self.growth_stage != 0: 
+         if crop_done or self.growth_stage >= 12 and self.harvest > 30 and self.growth_stage != 0: 
                 self.is_success = True
 
     info = {
        "is_success": self.is_success,
-       "termination_reason": "Growth stage reached 12 and harvest >= 30" if isinstance(self.growth_stage, str) and self.growth_stage == "Done" or self.growth_stage >= 12 and self.harvest >= 30
-                              else "Harvest fell below 10 before growth stage reached 12" if isinstance(self.growth_stage, str) and self.growth_stage == "Done" or self.growth_stage >= 12
+       "termination_reason": "Growth stage reached 12 and harvest >= 30" if crop_done or self.growth_stage >= 12 and self.harvest >= 30
+                              else "Harvest fell below 10 before growth stage reached 12" if crop_done or self.growth_stage >= 12
                                    else "Growth stage reached 5 before harvest fell below 30",  # Provide appropriate termination reason
+       "n_days": day + 1,  # Days simulated by this step
     }  # Any additional diagnostic information
+    if profiler is not None:
+        profiler.count("steps")
+        profiler.count("days", day + 1)
+        profiler.count("episodes", int(done))
+        profiler.tick()
 
-
-    return observation, reward, done, info 
-
-
-  # def _get_observation(self):
-  #   # Assuming all your attributes (self.current_day, self.daily_temperature, etc.) are either
-  #   # scalars or arrays that can be directly converted to tensors.
-
-  #   # Create a list of all observation components
-  #   obs_components = [
-  #       self.current_day,
-  #       self.current_month,
-  #       self.current_month_day,
-  #       self.current_year,
-  #       self.daily_temperature,
-  #       self.growth_stage,
-  #       self.accumulated_gdd,
-  #       self.accumulated_scarcity,
-  #       self.accumulated_excess,
-  #       self.soil_moisture_content,
-  #       self.water_needs,
-  #       self.etc,
-  #       self.rainfall,
-  #       self.harvest,
-  #       self.humidity,
-  #       self.is_raining,
-  #       self.sky_clearness,
-  #       self.is_cloudy,
-  #       self.rn_daily,
-  #       self.qv2m,
-  #       self.PS,
-  #       self.wind_speed,
-  #       self.is_crop_sick,
-  #   ]
-
-  #   # Convert each component to a tensor and flatten if necessary
-  #   tensor_components = [torch.tensor([item]).float() if isinstance(item, (int, float)) else torch.tensor(item).float() for item in obs_components]
-
-  #   # Concatenate all components into a single tensor
-  #   observation_tensor = torch.cat(tensor_components).view(1, -1)  # Reshape to 1 x N tensor
-
-  #   # Assuming 'device' is defined in your environment 
-  #   self.device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
-  #   observation_tensor = observation_tensor.to(self.device)  # Move tensor to the correct device
-
-  #   return observation_tensor
+    return observation, total_reward, done, info 
 
 
   def _get_observation(self):
+    if self.observation_mode == 'flat':
+        return write_flat_observation(self, self._flat_observation)
+
     # Return current state variables as observation
     return {
         "current_day": self.current_day,
@@ -433,8 +524,10 @@ class WheatGrowthEnv(gym.Env):
         return total_reward
   
   def render(self, mode='human'):
+    if self.profiler is not None:
+        self.profiler.count("render_calls")
     if self.render_mode == 'human':
-        output = (f"Day: {self.current_day}, Month: {self.current_month}\n"
+        output = (f"Day: {self.current_month_day}, Month: {self.current_month}\n"
               f"Temperature: {self.daily_temperature}°C, Humidity: {self.humidity}%\n"
               f"Growth Stage: {self.growth_stage}, Soil Moisture: {self.soil_moisture_content}\n"
               f"Water Excess: {self.accumulated_excess}, Water Scarcity: {self.accumulated_scarcity}\n"
@@ -442,7 +535,14 @@ class WheatGrowthEnv(gym.Env):
         print(output)
         time.sleep(0.5)  # To slow down the loop for visibility
     elif self.render_mode == 'rgb_array':
-        # Logic for rgb_array mode if needed
-        return self.renderer.render()
+        # Latest frame drawn by step, or a new one before the first step
+        if self.renderer.frame is None:
+            return self.renderer.render(force=True)
+        return self.renderer.frame
     else:
         raise NotImplementedError(f"Render mode {self.render_mode} not implemented")
+
+  def close(self):
+    if self._renderer is not None:
+        self._renderer.close()
+        self._renderer = None
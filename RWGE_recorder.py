@@ -0,0 +1,147 @@
+import glob
+import os
+import queue
+import threading
+
+import numpy as np
+
+RECORD_FORMATS = ("npz", "png")
+DROP_POLICIES = ("drop_newest", "drop_oldest", "block")
+
+
+class EpisodeRecorder:
+    """
+    Record the rgb_array frames of a WheatGrowthEnv on a background thread.
+
+    Frames go into a queue of at most ``max_queue`` frames, drained by a worker
+    thread into one directory per episode (``episode_00000``, ...), as
+    compressed ``.npz`` chunks of ``chunk_size`` frames (``format="npz"``) or
+    one ``.png`` per frame (``format="png"``). When the queue is full,
+    ``drop_policy`` decides: ``"drop_newest"`` skips the new frame,
+    ``"drop_oldest"`` discards the oldest queued one and ``"block"`` waits for
+    the worker. Only ``"block"`` can make the stepping thread wait.
+
+    ``attach(env)`` records every frame the env's renderer draws and starts a
+    new episode on every ``env.reset()``.
+    """
+
+    def __init__(self, directory, format="npz", chunk_size=64, max_queue=256, drop_policy="drop_newest"):
+        if format not in RECORD_FORMATS:
+            raise ValueError(f"format must be one of {RECORD_FORMATS}, got {format!r}")
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"drop_policy must be one of {DROP_POLICIES}, got {drop_policy!r}")
+        self.directory = directory
+        self.format = format
+        self.chunk_size = chunk_size
+        self.drop_policy = drop_policy
+
+        self.episode = 0
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.frames_written = 0
+        self._episode_frames = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._worker = threading.Thread(target=self._drain, name="EpisodeRecorder", daemon=True)
+        self._worker.start()
+        self.closed = False
+
+    def attach(self, env):
+        env.recorder = self
+        env.renderer.frame_listeners.append(self.add_frame)
+        return self
+
+    def new_episode(self):
+        # An episode without frames keeps its number
+        if self._episode_frames:
+            self.episode += 1
+            self._episode_frames = 0
+
+    def add_frame(self, frame):
+        """Queue a (height, width, 3) uint8 frame of the current episode."""
+        item = (self.episode, frame)
+        self.frames_captured += 1
+        self._episode_frames += 1
+        if self.drop_policy == "block":
+            self._queue.put(item)
+            return
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.frames_dropped += 1
+            if self.drop_policy == "drop_oldest":
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    self._queue.put_nowait(item)
+                except queue.Full:
+                    pass
+
+    def _episode_directory(self, episode):
+        path = os.path.join(self.directory, f"episode_{episode:05d}")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _write_npz(self, episode, chunk, frames):
+        path = os.path.join(self._episode_directory(episode), f"chunk_{chunk:05d}.npz")
+        with open(path + ".tmp", "wb") as f:
+            np.savez_compressed(f, frames=np.stack(frames))
+        os.replace(path + ".tmp", path)
+
+    def _write_png(self, episode, first_frame, frames):
+        # pygame is only needed by image sequences
+        import pygame
+        directory = self._episode_directory(episode)
+        for index, frame in enumerate(frames, start=first_frame):
+            height, width, _ = frame.shape
+            surface = pygame.image.frombuffer(np.ascontiguousarray(frame).tobytes(), (width, height), "RGB")
+            pygame.image.save(surface, os.path.join(directory, f"frame_{index:06d}.png"))
+
+    def _drain(self):
+        episode, frames, chunk, written = None, [], 0, 0
+
+        def flush():
+            nonlocal chunk, written, frames
+            if frames:
+                if self.format == "npz":
+                    self._write_npz(episode, chunk, frames)
+                else:
+                    self._write_png(episode, written, frames)
+                chunk += 1
+                written += len(frames)
+                self.frames_written += len(frames)
+                frames = []
+
+        while True:
+            item = self._queue.get()
+            if item is None:
+                flush()
+                return
+            frame_episode, frame = item
+            if frame_episode != episode:
+                # Rotate to the files of the new episode
+                flush()
+                episode, chunk, written = frame_episode, 0, 0
+            frames.append(frame)
+            if len(frames) >= self.chunk_size:
+                flush()
+
+    def close(self):
+        """Write the queued frames and stop the worker thread."""
+        if not self.closed:
+            self._queue.put(None)
+            self._worker.join()
+            self.closed = True
+
+
+def read_episode(directory, episode):
+    """Frames of one episode recorded as npz chunks, as a (frames, height, width, 3) array."""
+    paths = sorted(glob.glob(os.path.join(directory, f"episode_{episode:05d}", "chunk_*.npz")))
+    if not paths:
+        raise ValueError(f"No frames recorded for episode {episode} in {directory}")
+    chunks = []
+    for path in paths:
+        with np.load(path) as chunk:
+            chunks.append(chunk["frames"])
+    return np.concatenate(chunks)
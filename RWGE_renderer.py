@@ -2,16 +2,68 @@ import numpy as np
 import pygame
 
 class WheatGrowthRenderer:
-    def __init__(self, env):
+    """
+    Draw a WheatGrowthEnv with pygame.
+
+    In ``mode='human'`` frames go to a window, limited to ``fps`` frames per
+    second. In ``mode='rgb_array'`` they are drawn on an offscreen surface, no
+    display is needed, the clock is never ticked and ``render`` returns the
+    frame as a read-only uint8 array of shape (height, width, 3). Only every
+    ``render_every``-th call to ``render`` draws a frame; the others return the
+    previous one.
+    """
+
+    # Text color and the positions of the text lines
+    TEXT_COLOR = (0, 0, 0)
+    DATE_POSITION, TEMPERATURE_POSITION, ACTION_POSITION = (10, 10), (10, 35), (10, 60)
+
+    def __init__(self, env, mode='human', render_every=1, fps=60):
         self.env = env
-        pygame.init()
+        self.mode = mode
+        if render_every < 1:
+            raise ValueError(f"render_every must be at least 1, got {render_every}")
+        self.render_every = render_every
+        self.fps = fps
         self.window_width = 800
         self.window_height = 600
-        self.screen = pygame.display.set_mode((self.window_width, self.window_height))
-        pygame.display.set_caption("Wheat Growth Environment")
+        if mode == 'human':
+            pygame.init()
+            self.screen = pygame.display.set_mode((self.window_width, self.window_height))
+            pygame.display.set_caption("Wheat Growth Environment")
+        elif mode == 'rgb_array':
+            # Offscreen surface, only the font module is needed
+            pygame.font.init()
+            self.screen = pygame.Surface((self.window_width, self.window_height))
+        else:
+            raise ValueError(f"Render mode {mode} not implemented")
         self.font = pygame.font.SysFont('Arial', 20)  # Choose a font and size
         self.clock = pygame.time.Clock()
 
+        # Rendered surfaces of the static labels and of every character drawn so far
+        self._glyphs = {}
+        self.calls = 0
+        self.frame = None
+        # Callables receiving every rgb_array frame drawn, e.g. EpisodeRecorder.add_frame
+        self.frame_listeners = []
+
+    def _glyph(self, text):
+        glyph = self._glyphs.get(text)
+        if glyph is None:
+            glyph = self.font.render(text, True, self.TEXT_COLOR)
+            self._glyphs[text] = glyph
+        return glyph
+
+    def draw_text(self, label, value, position):
+        # Blit the cached label, then the value one cached character at a time
+        x, y = position
+        glyph = self._glyph(label)
+        self.screen.blit(glyph, (x, y))
+        x += glyph.get_width()
+        for char in value:
+            glyph = self._glyph(char)
+            self.screen.blit(glyph, (x, y))
+            x += glyph.get_width()
+
     def draw_wheat(self, wheat_height):
       base_x = self.window_width // 2
       base_y = self.window_height
@@ -19,44 +71,37 @@ class WheatGrowthRenderer:
           pygame.draw.arc(self.screen, (34, 177, 76), (base_x + i * 5, base_y - wheat_height, 10, wheat_height), np.pi, 2 * np.pi, 3)
 
 
-    def render(self, action=None):
+    def render(self, action=None, force=False):
+        self.calls += 1
+        if not force and (self.calls - 1) % self.render_every:
+            return self.frame
+
         self.screen.fill((255, 255, 255))  # Fill background with white
 
-        # Drawing logic
-        # Draw wheat plant
-        
-        # wheat_color = (34, 177, 76)  # Green for wheat plant
-        # wheat_width = 50  # Width of the wheat plant
-        wheat_height = int(self.window_height * self.env.growth_stage / 13)  # Height based on growth stage
+        # Draw wheat plant, height based on growth stage
+        wheat_height = int(self.window_height * self.env.growth_stage / 13)
         self.draw_wheat(wheat_height)
 
-        # # Position the wheat plant in the center of the window
-        # wheat_x = (self.window_width - wheat_width) // 2
-        # wheat_y = self.window_height - wheat_height
-
-        # Draw a rectangle to represent wheat growth stage
-        #pygame.draw.rect(self.screen, wheat_color, pygame.Rect(wheat_x, wheat_y, wheat_width, wheat_height))
-
-        # Displaying the date
-        date_str = f"Date: {self.env.current_day}-{self.env.current_month}-{self.env.current_year}"
-        date_text = self.font.render(date_str, True, (0, 0, 0))  # Black color for text
-        self.screen.blit(date_text, (10, 10))  # Position the text on screen
-
-        # Displaying temperature
-        temp_str = f"Temp: {self.env.daily_temperature}°C"
-        temp_text = self.font.render(temp_str, True, (0, 0, 0))
-        self.screen.blit(temp_text, (10, 35))  # Adjust position as needed
-
-        # Displaying the last action (irrigation amount)
+        # Displaying the date, the temperature and the last action (irrigation amount)
+        env = self.env
+        self.draw_text("Date: ", f"{env.current_month_day}-{env.current_month}-{env.current_year}", self.DATE_POSITION)
+        self.draw_text("Temp: ", f"{env.daily_temperature}°C", self.TEMPERATURE_POSITION)
         if action is not None:
-            action_str = f"Action: {action[0]:.2f}"  # Assuming action is a NumPy array
-            action_text = self.font.render(action_str, True, (0, 0, 0))
-            self.screen.blit(action_text, (10, 60))  # Adjust position as needed
+            # Assuming action is a NumPy array
+            self.draw_text("Action: ", f"{action[0]:.2f}", self.ACTION_POSITION)
 
+        if self.mode == 'human':
+            # Update display
+            pygame.display.flip()
+            self.clock.tick(self.fps)  # Limit to fps frames per second
+            return None
 
-        # Update display
-        pygame.display.flip()
-        self.clock.tick(60)  # Limit to 60 frames per second
+        # Row-major RGB bytes; about twice as fast as surfarray.array3d plus a transposed copy
+        pixels = pygame.image.tobytes(self.screen, 'RGB')
+        self.frame = np.frombuffer(pixels, dtype=np.uint8).reshape(self.window_height, self.window_width, 3)
+        for listener in self.frame_listeners:
+            listener(self.frame)
+        return self.frame
 
     def close(self):
         pygame.quit()
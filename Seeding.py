@@ -0,0 +1,90 @@
+import numpy as np
+
+
+def seed_sequence(seed=None):
+    """``seed`` as a numpy.random.SeedSequence; integers, None and SeedSequences are accepted."""
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    return np.random.SeedSequence(seed)
+
+
+def make_rng(seed=None):
+    """
+    numpy.random.Generator for ``seed``.
+
+    For an integer seed this is the same generator as gym.utils.seeding.np_random(seed).
+    """
+    return np.random.Generator(np.random.PCG64(seed_sequence(seed)))
+
+
+def spawn_seeds(seed, n):
+    """
+    ``n`` independent child SeedSequences of ``seed``.
+
+    Child ``i`` only depends on ``seed`` and ``i``, so seeding environment ``i``
+    with it gives the same trajectories whether the environments run one after
+    the other or spread over worker processes.
+    """
+    return seed_sequence(seed).spawn(n)
+
+
+def spawn_rngs(seed, n):
+    """One numpy.random.Generator per child of spawn_seeds(seed, n)."""
+    return [make_rng(child) for child in spawn_seeds(seed, n)]
+
+
+class LaneGenerators:
+    """
+    One numpy.random.Generator per lane of a batch, behind the Generator methods the simulators use.
+
+    ``normal``, ``uniform`` and ``random`` return arrays whose first axis is the
+    lane: row ``i`` only uses numbers of generator ``i``, so a lane's draws only
+    depend on its own seed, not on how many lanes share the batch.
+
+    Every lane pre-draws ``block_size`` standard normals and uniforms at a time,
+    so a draw is one array operation on the (lanes, block_size) buffers and the
+    per-lane generator calls are amortized over many steps.
+    """
+
+    def __init__(self, seeds, block_size=256):
+        self.generators = [make_rng(seed) for seed in seeds]
+        self.block_size = block_size
+        self._buffers = {}
+        self._cursors = {}
+
+    def __len__(self):
+        return len(self.generators)
+
+    def _shape(self, size, *parameters):
+        shape = np.broadcast_shapes(*(np.shape(parameter) for parameter in parameters),
+                                    () if size is None else np.empty(size, dtype=bool).shape)
+        if not shape or shape[0] != len(self.generators):
+            raise ValueError(f"Draws of {len(self.generators)} lanes need a leading axis of that length, got {shape}")
+        return shape
+
+    def _take(self, method, shape):
+        # The next prod(shape[1:]) numbers of every lane's stream, refilling the buffer when it runs out
+        count = int(np.prod(shape[1:]))
+        buffer = self._buffers.get(method)
+        cursor = self._cursors.get(method, 0)
+        if buffer is None or cursor + count > buffer.shape[1]:
+            left = 0 if buffer is None else buffer.shape[1] - cursor
+            refilled = np.empty((len(self.generators), max(self.block_size, left + count)))
+            if left:
+                refilled[:, :left] = buffer[:, cursor:]
+            # Each lane's generator writes the rest of its row in place
+            for generator, row in zip(self.generators, refilled):
+                getattr(generator, method)(out=row[left:])
+            buffer = self._buffers[method] = refilled
+            cursor = 0
+        self._cursors[method] = cursor + count
+        return buffer[:, cursor:cursor + count].reshape(shape)
+
+    def normal(self, loc=0.0, scale=1.0, size=None):
+        return loc + scale * self._take("standard_normal", self._shape(size, loc, scale))
+
+    def uniform(self, low=0.0, high=1.0, size=None):
+        return low + (high - low) * self._take("random", self._shape(size, low, high))
+
+    def random(self, size=None):
+        return self._take("random", self._shape(size)).copy()
@@ -0,0 +1,192 @@
+import csv
+import glob
+import json
+import os
+import sys
+
+import numpy as np
+
+
+class RowSink:
+    """
+    Receives simulated rows one at a time and writes them in chunks of ``chunk_size``.
+
+    Subclasses implement ``_write_chunk(rows, state)``. ``state`` is the value of
+    ``state_source()`` when the chunk is written (None without a state source);
+    resumable sinks save it with the chunk so a run can continue after the last
+    complete chunk, see ``resume``.
+    """
+
+    # True for sinks that can continue a run after the last written chunk
+    resumable = False
+
+    def __init__(self, columns, chunk_size=1024):
+        self.columns = list(columns)
+        self.chunk_size = chunk_size
+        self.state_source = None
+        self.rows_written = 0
+        self._buffer = []
+
+    @property
+    def rows(self):
+        """Rows received so far, written or still buffered."""
+        return self.rows_written + len(self._buffer)
+
+    def add_row(self, row):
+        self._buffer.append(row)
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            state = self.state_source() if self.state_source is not None else None
+            self._write_chunk(self._buffer, state)
+            self.rows_written += len(self._buffer)
+            self._buffer = []
+
+    def resume(self):
+        """
+        Prepare to continue after the last complete chunk.
+
+        Returns:
+        - state: The state saved with that chunk, None when nothing was written yet.
+        """
+        return None
+
+    def close(self):
+        self.flush()
+
+    def _write_chunk(self, rows, state):
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _write_json(path, data):
+    # Write through a temporary file so a crash never leaves a partial file behind
+    with open(path + ".tmp", "w") as f:
+        json.dump(data, f)
+    os.replace(path + ".tmp", path)
+
+
+class CsvSink(RowSink):
+    """
+    CSV file written one chunk at a time through a buffered file.
+
+    After every chunk the file's byte size and the chunk's state are saved to
+    ``<path>.state.json``; ``resume`` truncates the CSV back to that size and
+    appends from there.
+    """
+
+    resumable = True
+
+    def __init__(self, path, columns, chunk_size=1024, buffer_size=1 << 20):
+        super().__init__(columns, chunk_size)
+        self.path = path
+        self.state_path = path + ".state.json"
+        self.buffer_size = buffer_size
+        self._file = None
+        self._writer = None
+
+    def _open(self, mode):
+        self._file = open(self.path, mode, newline="", buffering=self.buffer_size)
+        self._writer = csv.writer(self._file)
+
+    def resume(self):
+        try:
+            with open(self.state_path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self.path):
+            return None
+        # Drop rows written after the last saved chunk
+        with open(self.path, "r+b") as f:
+            f.truncate(saved["offset"])
+        self._open("a")
+        self.rows_written = saved["rows"]
+        return saved["state"]
+
+    def _write_chunk(self, rows, state):
+        if self._file is None:
+            self._open("w")
+            self._writer.writerow(self.columns)
+        self._writer.writerows(rows)
+        self._file.flush()
+        _write_json(self.state_path, {"rows": self.rows_written + len(rows),
+                                      "offset": self._file.tell(), "state": state})
+
+    def close(self):
+        super().close()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class NpzChunkSink(RowSink):
+    """
+    Columnar binary chunks: ``chunk_000000.npz``, ``chunk_000001.npz``, ... in ``directory``.
+
+    Every chunk holds one array per column plus its state as JSON under
+    ``__state__``, and is written atomically. read_npz_chunks loads them back.
+    """
+
+    resumable = True
+
+    def __init__(self, directory, columns, chunk_size=4096):
+        super().__init__(columns, chunk_size)
+        self.directory = directory
+        self._chunks = 0
+
+    def _chunk_paths(self):
+        return sorted(glob.glob(os.path.join(self.directory, "chunk_*.npz")))
+
+    def resume(self):
+        paths = self._chunk_paths()
+        if not paths:
+            return None
+        with np.load(paths[-1]) as chunk:
+            saved = json.loads(str(chunk["__state__"]))
+        self._chunks = len(paths)
+        self.rows_written = saved["rows"]
+        return saved["state"]
+
+    def _write_chunk(self, rows, state):
+        os.makedirs(self.directory, exist_ok=True)
+        arrays = {name: np.asarray(values) for name, values in zip(self.columns, zip(*rows))}
+        arrays["__state__"] = np.array(json.dumps({"rows": self.rows_written + len(rows), "state": state}))
+        path = os.path.join(self.directory, f"chunk_{self._chunks:06d}.npz")
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(path + ".tmp", path)
+        self._chunks += 1
+
+
+def read_npz_chunks(directory):
+    """Columns of every chunk written by NpzChunkSink to ``directory``, concatenated in order."""
+    parts = {}
+    for path in sorted(glob.glob(os.path.join(directory, "chunk_*.npz"))):
+        with np.load(path) as chunk:
+            for name in chunk.files:
+                if name != "__state__":
+                    parts.setdefault(name, []).append(chunk[name])
+    return {name: np.concatenate(values) for name, values in parts.items()}
+
+
+class TableSink(RowSink):
+    """Print every chunk as a PrettyTable, for watching a run; nothing is kept."""
+
+    def __init__(self, columns, chunk_size=100, stream=None):
+        super().__init__(columns, chunk_size)
+        self.stream = stream
+
+    def _write_chunk(self, rows, state):
+        # prettytable is only needed when tables are actually printed
+        from prettytable import PrettyTable
+        table = PrettyTable(self.columns)
+        table.add_rows(rows)
+        print(table, file=self.stream or sys.stdout)
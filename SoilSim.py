@@ -1,28 +1,34 @@
 import numpy as np
-import pandas as pd
+
+from Climatology import DEFAULT_STATS_PATH, get_climatology
 
 
 class SoilSim:
-  
-  def __init__(self, *args, **kwargs):
-    pass
+
+  def __init__(self, *args, stats_path=DEFAULT_STATS_PATH, rng=None, **kwargs):
+    self.stats_path = stats_path
+    self.rng = rng if rng is not None else np.random.default_rng()
 
   def get_surface_soil_wetness(self, month):
-    file_path = "meteorological_data_statistics.csv"
-    weather_stats_df = pd.read_csv(file_path)
-    # Extract the row for the given month
-    month_stats = weather_stats_df[weather_stats_df['Month'] == month]
-
-    # Check if month_stats is not empty
-    if month_stats.empty:
-        raise ValueError(f"No data available for month {month}")
-    
-    mean_surface_moister = month_stats['GWETTOP_Mean'].iloc[0]
-    std_dev_surface_moister = month_stats['GWETTOP_StdDev'].iloc[0]
-    surface_moister = round(np.random.normal(mean_surface_moister, std_dev_surface_moister), 2)
+    climatology = get_climatology(self.stats_path)
+    # Extract the statistics for the given month
+    means, std_devs = climatology.month_stats(month)
+    column = climatology.column('GWETTOP')
+
+    mean_surface_moister = means[column]
+    std_dev_surface_moister = std_devs[column]
+    surface_moister = round(self.rng.normal(mean_surface_moister, std_dev_surface_moister), 2)
 
     return surface_moister
 
+  def get_surface_soil_wetness_batch(self, months, rng=None):
+    """Vectorized get_surface_soil_wetness for an array of months."""
+    climatology = get_climatology(self.stats_path)
+    column = climatology.column('GWETTOP')
+    rng = self.rng if rng is None else rng
+    return np.round(rng.normal(climatology.means[months - 1, column],
+                               climatology.std_devs[months - 1, column]), 2)
+
   
   def get_premeability(texture):
     # Textures 1 Sand 2 loamy 3 sandy loam 4 silty loam
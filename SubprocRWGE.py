@@ -0,0 +1,297 @@
+import multiprocessing
+import traceback
+from multiprocessing import connection, shared_memory
+
+import numpy as np
+from gym import spaces
+
+from BatchedRWGE import BatchedWheatGrowthEnv
+from Observation import OBSERVATION_KEYS, flat_observation_space
+from Seeding import seed_sequence
+
+# info["termination_reason"] of the fields of a worker that crashed and was restarted
+WORKER_RESTARTED = -1
+
+
+def _shared_layout(n_envs):
+    # (name, shape, dtype) of every array exchanged with the workers, all indexed by field first
+    n_fields = len(OBSERVATION_KEYS)
+    return (
+        ("actions", (n_envs,), np.float64),
+        ("observations", (n_envs, n_fields), np.float32),
+        ("final_observations", (n_envs, n_fields), np.float32),
+        ("rewards", (n_envs,), np.float64),
+        ("dones", (n_envs,), np.bool_),
+        ("is_success", (n_envs,), np.bool_),
+        ("termination_reason", (n_envs,), np.int8),
+    )
+
+
+def _shared_arrays(buffer, layout):
+    # Views of the layout's arrays laid out one after the other in buffer, 8-byte aligned
+    arrays, offset = {}, 0
+    for name, shape, dtype in layout:
+        array = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+        arrays[name] = array
+        offset += -(-array.nbytes // 8) * 8
+    return arrays
+
+
+def _shared_size(layout):
+    return sum(-(-int(np.prod(shape)) * np.dtype(dtype).itemsize // 8) * 8 for _, shape, dtype in layout)
+
+
+def _worker(conn, shm_name, n_envs, lanes, env_args, seeds):
+    # Step the fields lanes[0]:lanes[1] with one BatchedWheatGrowthEnv, one seed per field,
+    # reading the actions from and writing the results to the shared arrays; the pipe only
+    # carries commands
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        arrays = {name: array[lanes[0]:lanes[1]]
+                  for name, array in _shared_arrays(shm.buf, _shared_layout(n_envs)).items()}
+        env = BatchedWheatGrowthEnv(lanes[1] - lanes[0], *env_args, seed=seeds, observation_mode="flat")
+        while True:
+            command, data = conn.recv()
+            if command == "close":
+                break
+            try:
+                if command == "step":
+                    observation, reward, done, info = env.step(arrays["actions"])
+                    arrays["rewards"][:] = reward
+                    arrays["dones"][:] = done
+                    arrays["is_success"][:] = info["is_success"]
+                    arrays["termination_reason"][:] = info["termination_reason"]
+                    if "final_observation" in info:
+                        arrays["final_observations"][done] = info["final_observation"][done]
+                elif command == "reset":
+                    observation = env.reset(seed=data)
+                else:
+                    raise ValueError(f"Unknown command {command!r}")
+                arrays["observations"][:] = observation
+                conn.send(("ok", None))
+            except Exception:
+                conn.send(("error", traceback.format_exc()))
+        del arrays
+    finally:
+        shm.close()
+
+
+class SubprocWheatGrowthEnv:
+    """
+    ``n_envs`` wheat fields stepped by ``n_workers`` processes.
+
+    Every worker owns a contiguous slice of the fields as one
+    BatchedWheatGrowthEnv. Actions, flat observations, rewards and dones are
+    exchanged through one ``multiprocessing.shared_memory`` block; the pipes
+    only carry the step/reset/close commands. Observations, rewards and dones
+    returned by ``step_wait`` are views of the shared block, overwritten by
+    the next step, so copy them to keep them.
+
+    Field ``i`` draws from its own generator seeded with child ``i`` of
+    ``seed`` (see Seeding), so its trajectory does not depend on ``n_workers``.
+    A worker that dies, or does not answer within ``timeout`` seconds, is
+    replaced by a fresh one whose fields are seeded with new children of their
+    seeds: they are reported done with reward 0, termination reason
+    WORKER_RESTARTED and a NaN final observation, and start a new episode. A
+    worker that cannot be restarted in ``max_restarts`` attempts raises a
+    RuntimeError.
+    """
+
+    def __init__(self, n_envs, start_month, start_day, end_month, end_day, n_workers=None,
+                 seed=None, timeout=None, context=None, max_restarts=3):
+        if n_envs < 1:
+            raise ValueError(f"n_envs must be at least 1, got {n_envs}")
+        n_workers = min(n_envs, n_workers or multiprocessing.cpu_count())
+        self.n_envs = n_envs
+        self.n_workers = n_workers
+        self.timeout = timeout
+        self.max_restarts = max_restarts
+        self._env_args = (start_month, start_day, end_month, end_day)
+        self._context = multiprocessing.get_context(context)
+
+        self.single_action_space = spaces.Box(low=0, high=11, shape=(1,), dtype=float)
+        self.action_space = spaces.Box(low=0, high=11, shape=(n_envs,), dtype=float)
+        self.single_observation_space = flat_observation_space()
+        self.observation_space = flat_observation_space(n_envs)
+
+        layout = _shared_layout(n_envs)
+        self._shm = shared_memory.SharedMemory(create=True, size=_shared_size(layout))
+        self._arrays = _shared_arrays(self._shm.buf, layout)
+
+        # Fields of every worker, as evenly split as possible
+        bounds = np.linspace(0, n_envs, n_workers + 1).astype(int)
+        self._lanes = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+        self._field_seeds = seed_sequence(seed).spawn(n_envs)
+        self._reseed = False
+        self._processes = [None] * n_workers
+        self._conns = [None] * n_workers
+        self._restarted = np.zeros(n_envs, dtype=bool)
+        self._waiting = False
+        self._unsent = set()
+        self.closed = False
+        for index in range(n_workers):
+            self._start_worker(index, self._worker_seeds(index))
+
+    def _worker_seeds(self, index):
+        lo, hi = self._lanes[index]
+        return self._field_seeds[lo:hi]
+
+    def _start_worker(self, index, seeds):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker, daemon=True,
+            args=(child_conn, self._shm.name, self.n_envs, self._lanes[index], self._env_args, seeds))
+        process.start()
+        child_conn.close()
+        self._processes[index] = process
+        self._conns[index] = parent_conn
+
+    def _stop_worker(self, index):
+        process = self._processes[index]
+        if process.is_alive():
+            process.terminate()
+        process.join()
+        self._conns[index].close()
+
+    def _restart_worker(self, index):
+        for _ in range(self.max_restarts):
+            self._stop_worker(index)
+            # New children of the fields' seeds, so restarts stay reproducible
+            self._start_worker(index, [seed.spawn(1)[0] for seed in self._worker_seeds(index)])
+            try:
+                self._conns[index].send(("reset", None))
+            except (BrokenPipeError, OSError):
+                self._unsent.add(index)
+            crashed, errors = self._collect([index])
+            if errors:
+                raise RuntimeError("\n".join(errors))
+            if not crashed:
+                break
+        else:
+            raise RuntimeError(f"Worker {index} crashed on every one of {self.max_restarts} restarts")
+
+        lo, hi = self._lanes[index]
+        self._arrays["rewards"][lo:hi] = 0
+        self._arrays["dones"][lo:hi] = True
+        self._arrays["is_success"][lo:hi] = False
+        self._arrays["termination_reason"][lo:hi] = WORKER_RESTARTED
+        self._arrays["final_observations"][lo:hi] = np.nan
+        self._restarted[lo:hi] = True
+
+    def _send(self, command, data=None):
+        # data is one payload per worker, or None; a worker whose pipe is broken has
+        # crashed since the last command and is restarted by the next _wait
+        for index, conn in enumerate(self._conns):
+            try:
+                conn.send((command, None if data is None else data[index]))
+            except (BrokenPipeError, OSError):
+                self._unsent.add(index)
+
+    def _collect(self, workers):
+        # One answer per worker: the workers that crashed or timed out, and the errors raised
+        crashed = [index for index in workers if index in self._unsent]
+        self._unsent.difference_update(crashed)
+        pending = {self._conns[index]: index for index in workers if index not in crashed}
+        errors = []
+        while pending:
+            sentinels = {self._processes[index].sentinel: index for index in pending.values()}
+            ready = connection.wait(list(pending) + list(sentinels), timeout=self.timeout)
+            if not ready:
+                crashed.extend(pending.values())
+                break
+            for conn in [conn for conn in pending if conn in ready or
+                         self._processes[pending[conn]].sentinel in ready]:
+                index = pending.pop(conn)
+                try:
+                    status, payload = conn.recv()
+                except (EOFError, OSError):
+                    crashed.append(index)
+                    continue
+                if status == "error":
+                    errors.append(f"Worker {index} failed:\n{payload}")
+        return crashed, errors
+
+    def _wait(self, workers):
+        # Collect one answer per worker; restart the ones that crashed or timed out
+        crashed, errors = self._collect(workers)
+        for index in crashed:
+            self._restart_worker(index)
+        if errors:
+            raise RuntimeError("\n".join(errors))
+
+    def seed(self, seed=None):
+        """Reseed every field with the children of ``seed``; takes effect on the next reset."""
+        seed = seed_sequence(seed)
+        self._field_seeds = seed.spawn(self.n_envs)
+        self._reseed = True
+        return [seed.entropy]
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.seed(seed)
+        if self._reseed:
+            self._send("reset", [self._worker_seeds(index) for index in range(self.n_workers)])
+        else:
+            self._send("reset")
+        self._reseed = False
+        self._wait(range(self.n_workers))
+        self._restarted[:] = False
+        return self._arrays["observations"]
+
+    def step_async(self, actions):
+        if self._waiting:
+            raise RuntimeError("step_async called again before step_wait")
+        self._arrays["actions"][:] = np.asarray(actions, dtype=float).reshape(self.n_envs)
+        self._restarted[:] = False
+        self._send("step")
+        self._waiting = True
+
+    def step_wait(self):
+        if not self._waiting:
+            raise RuntimeError("step_wait called without step_async")
+        self._waiting = False
+        self._wait(range(self.n_workers))
+
+        arrays = self._arrays
+        dones = arrays["dones"]
+        info = {
+            "is_success": arrays["is_success"].copy(),
+            "termination_reason": arrays["termination_reason"].copy(),
+        }
+        if dones.any():
+            info["final_observation"] = np.where(dones[:, None], arrays["final_observations"], np.nan)
+        if self._restarted.any():
+            info["restarted"] = self._restarted.copy()
+        return arrays["observations"], arrays["rewards"], dones, info
+
+    def step(self, actions):
+        self.step_async(actions)
+        return self.step_wait()
+
+    def close(self):
+        if self.closed:
+            return
+        if self._waiting:
+            try:
+                self._wait(range(self.n_workers))
+            except RuntimeError:
+                pass
+        for conn, process in zip(self._conns, self._processes):
+            try:
+                conn.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+        for conn, process in zip(self._conns, self._processes):
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+            conn.close()
+        self._arrays = None
+        self._shm.close()
+        self._shm.unlink()
+        self.closed = True
+
+    def __del__(self):
+        if not getattr(self, "closed", True):
+            self.close()
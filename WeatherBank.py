@@ -0,0 +1,176 @@
+import datetime
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from Climatology import DEFAULT_STATS_PATH
+from Calendar import START_YEAR, get_calendar
+from WeatherSim import WeatherSim
+
+# Default memory budget of the shared bank cache (256 MB)
+DEFAULT_MEMORY_BUDGET = 256 * 1024 ** 2
+
+# Bump when the sampling of banks changes, so banks saved by older versions are ignored
+BANK_VERSION = 3
+
+
+def season_length(start_month, start_day, end_month, end_day):
+    """Number of days from the start to the end date (inclusive), wrapping into the next year."""
+    start = datetime.date(START_YEAR, start_month, start_day)
+    end = datetime.date(START_YEAR, end_month, end_day)
+    if end < start:
+        end = end.replace(year=START_YEAR + 1)
+    return (end - start).days + 1
+
+
+def season_months(start_month, start_day, season_days):
+    """
+    Month of every simulated day of a season starting on start_month/start_day of START_YEAR.
+
+    Returns:
+    - months: Integer array of length season_days.
+    """
+    calendar = get_calendar()
+    start = calendar.ordinal(START_YEAR, start_month, start_day)
+    return calendar.months[start:start + season_days].copy()
+
+
+class WeatherBank:
+    """
+    K pre-sampled weather trajectories of one season window.
+
+    ``trajectories`` has shape (K, season_days, len(WeatherSim.WEATHER_FIELDS));
+    ``day(k, d)`` returns the sim_weather tuple of day ``d`` of trajectory ``k``.
+    ``soil_wetness`` optionally holds the (K, season_days) surface soil wetness
+    to use instead of SoilSim, e.g. for recorded seasons.
+    """
+
+    def __init__(self, trajectories, key=None, soil_wetness=None):
+        if trajectories.ndim != 3 or trajectories.shape[2] != len(WeatherSim.WEATHER_FIELDS):
+            raise ValueError(f"Expected trajectories of shape (K, days, {len(WeatherSim.WEATHER_FIELDS)}), "
+                             f"got {trajectories.shape}")
+        if soil_wetness is not None and soil_wetness.shape != trajectories.shape[:2]:
+            raise ValueError(f"Expected soil wetness of shape {trajectories.shape[:2]}, got {soil_wetness.shape}")
+        self.trajectories = trajectories
+        self.key = key
+        self.soil_wetness = soil_wetness
+
+    @property
+    def n_trajectories(self):
+        return self.trajectories.shape[0]
+
+    @property
+    def season_days(self):
+        return self.trajectories.shape[1]
+
+    @property
+    def nbytes(self):
+        soil_nbytes = self.soil_wetness.nbytes if self.soil_wetness is not None else 0
+        return self.trajectories.nbytes + soil_nbytes
+
+    def day(self, trajectory, day):
+        return tuple(self.trajectories[trajectory, day].tolist())
+
+    @classmethod
+    def sample(cls, start_month, start_day, end_month, end_day, n_trajectories,
+               seed=None, stats_path=DEFAULT_STATS_PATH):
+        """Draw ``n_trajectories`` seasons from the monthly statistics at ``stats_path``."""
+        months = season_months(start_month, start_day, season_length(start_month, start_day, end_month, end_day))
+        weather = WeatherSim(stats_path).sim_weather_batch(np.tile(months, n_trajectories),
+                                                           rng=np.random.default_rng(seed))
+        trajectories = np.stack([weather[field] for field in WeatherSim.WEATHER_FIELDS], axis=-1)
+        trajectories = trajectories.astype(float).reshape(n_trajectories, len(months), -1)
+        return cls(trajectories, key=(os.path.abspath(stats_path),
+                                      (start_month, start_day, end_month, end_day), seed, n_trajectories))
+
+
+class WeatherBankCache:
+    """
+    Weather banks keyed by (stats file, window, seed, K) with LRU eviction.
+
+    Banks are kept in memory until their total size exceeds ``memory_budget``
+    bytes, at which point the least recently used ones are dropped. When
+    ``directory`` is given, banks are also saved there as ``.npy`` files and
+    later opened memory-mapped instead of being sampled again.
+    """
+
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET, directory=None):
+        self.memory_budget = memory_budget
+        self.directory = directory
+        self._banks = OrderedDict()
+
+    @property
+    def nbytes(self):
+        return sum(bank.nbytes for bank in self._banks.values())
+
+    def __len__(self):
+        return len(self._banks)
+
+    def _file_path(self, key):
+        stats_path = key[0]
+        stat = os.stat(stats_path)
+        # The stats file's size and mtime invalidate banks sampled from an older version
+        digest = hashlib.sha1(repr((BANK_VERSION, key, stat.st_size, stat.st_mtime_ns)).encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f"weather_bank_{digest}.npy")
+
+    def get(self, start_month, start_day, end_month, end_day, n_trajectories=64,
+            seed=0, stats_path=DEFAULT_STATS_PATH):
+        key = (os.path.abspath(stats_path), (start_month, start_day, end_month, end_day),
+               seed, n_trajectories)
+        bank = self._banks.get(key)
+        if bank is not None:
+            self._banks.move_to_end(key)
+            return bank
+
+        file_path = self._file_path(key) if self.directory is not None else None
+        shape = (n_trajectories, season_length(start_month, start_day, end_month, end_day),
+                 len(WeatherSim.WEATHER_FIELDS))
+        trajectories = self._load(file_path, shape) if file_path is not None else None
+        if trajectories is not None:
+            bank = WeatherBank(trajectories, key=key)
+        else:
+            bank = WeatherBank.sample(start_month, start_day, end_month, end_day, n_trajectories,
+                                      seed=seed, stats_path=stats_path)
+            if file_path is not None:
+                self._save(file_path, bank.trajectories)
+
+        self._banks[key] = bank
+        self._evict()
+        return bank
+
+    @staticmethod
+    def _load(file_path, shape):
+        # The saved trajectories memory-mapped, or None when missing, unreadable or of another shape
+        try:
+            trajectories = np.load(file_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        return trajectories if trajectories.shape == shape else None
+
+    def _save(self, file_path, trajectories):
+        # Written next to the final path and renamed, so readers never map a partial file
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            np.save(f, trajectories)
+        os.replace(temp_path, file_path)
+
+    def _evict(self):
+        # Drop least recently used banks, but never the one just requested
+        while len(self._banks) > 1 and self.nbytes > self.memory_budget:
+            self._banks.popitem(last=False)
+
+    def clear(self):
+        self._banks.clear()
+
+
+_default_cache = WeatherBankCache()
+
+
+def get_weather_bank(start_month, start_day, end_month, end_day, n_trajectories=64,
+                     seed=0, stats_path=DEFAULT_STATS_PATH):
+    """Return a bank from the process-wide WeatherBankCache."""
+    return _default_cache.get(start_month, start_day, end_month, end_day, n_trajectories,
+                              seed=seed, stats_path=stats_path)
@@ -1,26 +1,127 @@
 import math
-import random
 
-from numpy import random as rand
 import numpy as np
-import pandas as pd
+
+from Climatology import DEFAULT_STATS_PATH, get_climatology
+
+# Values returned by reference_et0, in order
+ET0_FIELDS = ('evaporation', 'es', 'ea', 'delta', 'gamma')
+
+# Inputs computed with math instead of NumPy; np.float64 is a float subclass
+_scalar_types = (int, float, np.number)
+
+
+def _reference_et0_scalar(T, RH, u2, PS, QV2M, Rn, G):
+    # math on Python floats, far cheaper than NumPy calls for a single day
+    es = 0.6108 * math.exp((17.27 * T) / (T + 237.3))
+    ea = (RH / 100) * es
+    delta = (4098 * es) / ((T + 237.3) ** 2)
+    q = QV2M if QV2M == 1 else QV2M / (1 - QV2M)
+    if T:
+        gamma = 0.00163 * PS / (1005 + (q * 461 / T))
+    else:
+        # Same IEEE division by zero as the array path instead of a ZeroDivisionError
+        gamma = 0.00163 * PS / (1005 + float(np.float64(q * 461) / np.float64(T)))
+    et0 = ((0.408 * delta * (Rn - G) + gamma * (900 / (T + 273)) * u2 * (es - ea))
+           / (delta + gamma * (1 + 0.34 * u2)))
+    return et0, es, ea, delta, gamma
+
+
+def reference_et0(T, RH, u2, PS, QV2M, Rn, G, out=None, dtype=None):
+    """
+    Reference evapotranspiration (ET0) with the FAO-56 Penman-Monteith equation,
+    together with the intermediate values of the WeatherSim.calculate_* helpers.
+
+    Parameters:
+    - T: Air temperature at 2 meters (°C)
+    - RH: Relative humidity at 2 meters (%)
+    - u2: Wind speed at 2 meters (m/s)
+    - PS: Surface pressure (kPa)
+    - QV2M: Specific humidity at 2 meters
+    - Rn: Net radiation at the crop surface (MJ/m^2/day)
+    - G: Soil heat flux density (MJ/m^2/day)
+    - out: Optional array of shape (len(ET0_FIELDS) + 1,) + the broadcast input
+      shape; the results are written to its first rows and the last row is
+      scratch space, so repeated calls allocate nothing.
+    - dtype: Computation dtype of the array path, e.g. np.float32 (default:
+      out's dtype, else float64).
+
+    Returns:
+    - ET0_FIELDS values (et0, es, ea, delta, gamma): floats when every input is
+      a scalar, else arrays (rows of ``out`` when given). Both paths divide by
+      T like NumPy: T == 0 gives gamma 0 (NaN when QV2M is 0) with a
+      RuntimeWarning rather than an exception.
+    """
+    if out is None and all(isinstance(value, _scalar_types) for value in (T, RH, u2, PS, QV2M, Rn, G)):
+        return _reference_et0_scalar(float(T), float(RH), float(u2), float(PS), float(QV2M), float(Rn), float(G))
+
+    if dtype is None:
+        dtype = out.dtype if out is not None else np.float64
+    T, RH, u2, PS, QV2M, Rn, G = (np.asarray(value, dtype=dtype) for value in (T, RH, u2, PS, QV2M, Rn, G))
+    if out is None:
+        out = np.empty((len(ET0_FIELDS) + 1,) + np.broadcast_shapes(T.shape, RH.shape, u2.shape, PS.shape,
+                                                                     QV2M.shape, Rn.shape, G.shape), dtype=dtype)
+    et0, es, ea, delta, gamma, work = out
+
+    # Saturation vapor pressure, one exp shared with the slope delta
+    np.add(T, 237.3, out=work)
+    np.multiply(T, 17.27, out=es)
+    np.divide(es, work, out=es)
+    np.exp(es, out=es)
+    es *= 0.6108
+    # Actual vapor pressure
+    np.multiply(RH, 0.01, out=ea)
+    ea *= es
+    # Slope of the saturation vapor pressure curve
+    np.square(work, out=delta)
+    np.divide(es, delta, out=delta)
+    delta *= 4098
+    # Psychrometric constant from the specific heat of moist air
+    np.subtract(1, QV2M, out=gamma)
+    gamma[gamma == 0] = 1
+    np.divide(QV2M, gamma, out=gamma)
+    gamma *= 461
+    gamma /= T
+    gamma += 1005
+    np.divide(PS, gamma, out=gamma)
+    gamma *= 0.00163
+
+    # Numerator: 0.408 * delta * (Rn - G) + gamma * 900 / (T + 273) * u2 * (es - ea)
+    np.add(T, 273, out=et0)
+    np.divide(900, et0, out=et0)
+    et0 *= gamma
+    et0 *= u2
+    np.subtract(es, ea, out=work)
+    et0 *= work
+    np.subtract(Rn, G, out=work)
+    work *= delta
+    work *= 0.408
+    et0 += work
+    # Denominator: delta + gamma * (1 + 0.34 * u2)
+    np.multiply(u2, 0.34, out=work)
+    work += 1
+    work *= gamma
+    work += delta
+    et0 /= work
+    return et0, es, ea, delta, gamma
+
 
 class WeatherSim:
 
   def calculate_es(self, T):
       """Calculate saturation vapor pressure."""
       result = 0.6108 * np.exp((17.27 * T) / (T + 237.3))
-      return round(result, 2)
+      return np.round(result, 2)
 
   def calculate_ea(self, es, RH2M):
       """Calculate actual vapor pressure."""
       result = (RH2M/100) * es
-      return round(result, 2)
+      return np.round(result, 2)
 
   def calculate_slope_curve(self, T, es):
     """Calculate the slope of the saturation vapor pressure curve."""
     result = (4098 * es) / ((T + 237.3) ** 2)
-    return round(result, 2)
+    return np.round(result, 2)
   
   # Function to calculate specific humidity (q) from QV2M
   def calculate_specific_humidity(self, QV2M):
@@ -87,19 +188,13 @@ class WeatherSim:
     # the efficiency with which the soil conducts heat 
     # compared to the total incoming radiation.
     # Generate a random fraction alpha between 0.1 and 0.3
-    alpha = random.uniform(0.1, 0.3)
+    alpha = self.rng.uniform(0.1, 0.3)
     
     # Calculate soil heat flux density (G)
     soil_heat_flux = alpha * net_radiation
     
     return soil_heat_flux
 
-  def penman_monteith(R_n, G, T, u2, es, ea, delta, gamma):
-      """Calculate reference evapotranspiration (ET0)."""
-      numerator = 0.408 * delta * (R_n - G) + gamma * (900 / (T + 273)) * u2 * (es - ea)
-      denominator = delta + gamma * (1 + 0.34 * u2)
-      return numerator / denominator
-
   # Provided parameters
   T2M = 25.0  # Air temperature at 2 meters (°C)
   RH2M = 50.0  # Relative humidity at 2 meters (%)
@@ -109,28 +204,10 @@ class WeatherSim:
   c_p = 1.013  # Specific heat of air at constant pressure (kJ/kg°C)
 
 # # Calculate ET0
-# et0 = penman_monteith(R_n, G, T2M, WS2M, es, ea, delta, gamma)
+# et0 = reference_et0(T2M, RH2M, WS2M, PS, QV2M, R_n, G)[0]
 
 # print(f"Reference Evapotranspiration (ET0): {et0:.2f} mm/day")
 
-  def calculate_slope_saturation_vapor_pressure_curve(T):
-    """
-    Calculate the slope of the saturation vapor pressure curve (delta).
-
-    Parameters:
-    - T: Air temperature in degrees Celsius.
-
-    Returns:
-    - Delta: Slope of the saturation vapor pressure curve in kPa/°C.
-    """
-    delta = (4098 * (0.6108 * math.exp((17.27 * T) / (T + 237.3)))) / ((T + 237.3) ** 2)
-    return delta
-
-# Example usage:
-# temperature = 25  # Example temperature in degrees Celsius
-# delta_result = calculate_slope_saturation_vapor_pressure_curve(temperature)
-# print(f"Slope of Saturation Vapor Pressure Curve (Delta): {delta_result:.6f} kPa/°C")
-
   def calculate_et0(self, delta, Rn, G, gamma, T, u2, es, ea):
     """
     Calculate reference evapotranspiration (ET0) using the Penman-Monteith equation.
@@ -148,7 +225,7 @@ class WeatherSim:
     Returns:
     - ET0: Reference evapotranspiration (mm/day)
     """
-    ET0 = 0.408 * delta * (Rn - G) + gamma * (900 / (T + 273)) * u2 * (es - ea) / (delta + gamma * (1 + 0.34 * u2))
+    ET0 = (0.408 * delta * (Rn - G) + gamma * (900 / (T + 273)) * u2 * (es - ea)) / (delta + gamma * (1 + 0.34 * u2))
     return ET0
 
 # Example usage:
@@ -165,67 +242,33 @@ class WeatherSim:
 # print(f"Reference Evapotranspiration (ET0): {ET0_result:.2f} mm/day")
 
 
-  def __init__(self):
-      pass
+  # Order of the variables drawn for each simulated day
+  SAMPLED_VARIABLES = ('T2M', 'RH2M', 'PRECTOTCORR', 'WS2M', 'PS', 'QV2M', 'rn_daily', 'ALLSKY_KT')
 
-  def sim_weather(self, month):
-    file_path = "meteorological_data_statistics.csv"
-    weather_stats_df = pd.read_csv(file_path)
-    # Extract the row for the given month
-    month_stats = weather_stats_df[weather_stats_df['Month'] == month]
+  # Names of the values returned by sim_weather, in order; also the keys of sim_weather_batch
+  WEATHER_FIELDS = ('temperature', 'humidity', 'wind_speed', 'is_raining', 'rain_quantity',
+                    'sky_clearness', 'is_cloudy', 'evaporation', 'rn_daily', 'qv2m', 'ps',
+                    'es', 'ea', 'delta', 'G', 'gamma')
 
-    # Check if month_stats is not empty
-    if month_stats.empty:
-        raise ValueError(f"No data available for month {month}")
+  def __init__(self, stats_path=DEFAULT_STATS_PATH, rng=None):
+      self.stats_path = stats_path
+      self._climatology = None
+      # numpy.random.Generator behind every draw; environments replace it when seeded
+      self.rng = rng if rng is not None else np.random.default_rng()
+
+  def sim_weather(self, month):
+    climatology = get_climatology(self.stats_path)
+    # Extract the statistics for the given month
+    means, std_devs = climatology.month_stats(month)
+    columns = climatology.columns(self.SAMPLED_VARIABLES)
 
     # Generate weather parameters using Monte Carlo Simulation
-    # Temperature
-    mean_temp = month_stats['T2M_Mean'].iloc[0]
-    std_dev_temp = month_stats['T2M_StdDev'].iloc[0]
-    temperature = round(np.random.normal(mean_temp, std_dev_temp), 2)
-
-    # Humidity
-    humidity_mean = month_stats['RH2M_Mean'].iloc[0]
-    humidity_std = month_stats['RH2M_StdDev'].iloc[0]
-    humidity = round(np.random.normal(humidity_mean, humidity_std), 2)
-
-    # Rain Quantity
-    rain_mean = month_stats['PRECTOTCORR_Mean'].iloc[0]
-    rain_std = month_stats['PRECTOTCORR_StdDev'].iloc[0]
-    rain_quantity = round(np.random.normal(rain_mean, rain_std), 2)
-
-    # Wind Speed
-    wind_speed_mean = month_stats['WS2M_Mean'].iloc[0]
-    wind_speed_std = month_stats['WS2M_StdDev'].iloc[0]
-    wind_speed = round(np.random.normal(wind_speed_mean, wind_speed_std), 2)
-
-    # Surface Pressure
-    ps_mean = month_stats['PS_Mean'].iloc[0]
-    ps_std = month_stats['PS_StdDev'].iloc[0]
-    ps = round(np.random.normal(ps_mean, ps_std), 2)
-
-    # Specific humidity
-    qv2m_mean = month_stats['QV2M_Mean'].iloc[0]
-    qv2m_std = month_stats['QV2M_StdDev'].iloc[0]
-    qv2m = round(np.random.normal(qv2m_mean, qv2m_std), 2)
-
-    # daily sun radiation
-    rn_daily_mean = month_stats['rn_daily_Mean'].iloc[0]
-    rn_daily_std = month_stats['rn_daily_StdDev'].iloc[0]
-    rn_daily = round(np.random.normal(rn_daily_mean, rn_daily_std), 2)
-
-    # sky clearness
-    sky_clearness_mean = month_stats['ALLSKY_KT_Mean'].iloc[0]
-    sky_clearness_std = month_stats['ALLSKY_KT_StdDev'].iloc[0]
-    sky_clearness = round(np.random.normal(sky_clearness_mean, sky_clearness_std), 2)
-
-
-
-    # 1- Calculate satured vapor pressure
-    es = self.calculate_es(temperature)
-    # 2- Calculate Actual vapor pressure
-    ea = self.calculate_ea(es, humidity) 
-    
+    # (temperature, humidity, rain quantity, wind speed, surface pressure,
+    # specific humidity, daily sun radiation, sky clearness)
+    samples = self.rng.normal(means[columns], std_devs[columns])
+    temperature, humidity, rain_quantity, wind_speed, ps, qv2m, rn_daily, sky_clearness = \
+        (round(float(value), 2) for value in samples)
+
     is_raining = False
     rain_quantity =  0
     if rain_quantity > 0:
@@ -235,24 +278,68 @@ class WeatherSim:
     if sky_clearness < 0.5:
       is_cloudy = True
 
-    # 3- Calculate Slope curve
-    delta = self.calculate_slope_curve(temperature, es)
-
-    # 4- Calculate Soil heat flux
+    # Calculate Soil heat flux
     G = self.calculate_soil_heat_flux(rn_daily)
 
-    # 5- Calculate specific humidity
-    q = self.calculate_specific_humidity(qv2m)
+    # Calculate vapor pressures, slope curve, gamma and Evaporation in one kernel
+    evaporation, es, ea, delta, gamma = reference_et0(temperature, humidity, wind_speed, ps, qv2m, rn_daily, G)
 
-    # 6- Calculate specific heat
-    c_p = self.calculate_specific_heat(temperature, q)
+    return (temperature,humidity, wind_speed, is_raining, rain_quantity, 
+            sky_clearness, is_cloudy, evaporation, rn_daily, qv2m, ps, es, ea, delta, G, gamma) 
 
-    # 7- Calculate gamma
-    gamma = self.calculate_ps(c_p, ps)
+  def _sampling_tables(self):
+    # Means and std devs of SAMPLED_VARIABLES per month, rebuilt when the statistics are reloaded
+    climatology = get_climatology(self.stats_path)
+    if climatology is not self._climatology:
+        columns = climatology.columns(self.SAMPLED_VARIABLES)
+        self._sample_means = climatology.means[:, columns]
+        self._sample_std_devs = climatology.std_devs[:, columns]
+        self._climatology = climatology
+    return climatology, self._sample_means, self._sample_std_devs
+
+  def sim_weather_batch(self, months, rng=None, dtype=None):
+    """
+    Simulate the weather of many days at once.
 
-    # 8- Calculate Evaporation 
-    evaporation = self.calculate_et0(delta, rn_daily, G, gamma, temperature, wind_speed, es, ea)
+    Parameters:
+    - months: Array of months (1-12), one per simulated day, or an array of
+      numpy.datetime64 dates such as a season's date range.
+    - rng: numpy.random.Generator to draw from (default: self.rng).
+    - dtype: Optional dtype of the ET0 computation, e.g. np.float32.
 
-    return (temperature,humidity, wind_speed, is_raining, rain_quantity, 
-            sky_clearness, is_cloudy, evaporation, rn_daily, qv2m, ps, es, ea, delta, G, gamma) 
-      
\ No newline at end of file
+    Returns:
+    - weather: Dict mapping every name of WEATHER_FIELDS to an array with one
+      value per day, computed with the same rules as sim_weather.
+    """
+    months = np.asarray(months)
+    if months.dtype.kind == 'M':
+        months = months.astype('datetime64[M]').astype(int) % 12 + 1
+    months = months.astype(int, copy=False)
+    rng = self.rng if rng is None else rng
+
+    climatology, means, std_devs = self._sampling_tables()
+    if not (np.all((months >= 1) & (months <= 12)) and climatology.available_months[months - 1].all()):
+        invalid = [month for month in np.unique(months)
+                   if not (1 <= month <= 12) or not climatology.available_months[month - 1]]
+        raise ValueError(f"No data available for month {invalid[0]}")
+
+    # Generate weather parameters using Monte Carlo Simulation, one row per day
+    samples = rng.normal(means[months - 1], std_devs[months - 1])
+    np.round(samples, 2, out=samples)
+    temperature, humidity, rain_quantity, wind_speed, ps, qv2m, rn_daily, sky_clearness = samples.T
+
+    # Rain is disabled as in sim_weather
+    rain_quantity = np.zeros(len(months))
+    is_raining = rain_quantity > 0
+    is_cloudy = sky_clearness < 0.5
+
+    # Calculate Soil heat flux
+    G = rng.uniform(0.1, 0.3, len(months)) * rn_daily
+
+    # Calculate vapor pressures, slope curve, gamma and Evaporation in one kernel
+    evaporation, es, ea, delta, gamma = reference_et0(temperature, humidity, wind_speed, ps, qv2m, rn_daily, G,
+                                                      dtype=dtype)
+
+    return dict(zip(self.WEATHER_FIELDS,
+                    (temperature, humidity, wind_speed, is_raining, rain_quantity,
+                     sky_clearness, is_cloudy, evaporation, rn_daily, qv2m, ps, es, ea, delta, G, gamma)))
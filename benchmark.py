@@ -0,0 +1,295 @@
+"""
+Headless benchmarks of the simulation hot paths.
+
+Every benchmark runs at each batch size: batch size 1 times the scalar API
+(WheatGrowthEnv, sim_weather, ...), larger batch sizes the vectorized one
+(BatchedWheatGrowthEnv, sim_weather_batch, ...) or, where there is none, the
+scalar API in a loop. Results are written as JSON and can be compared with a
+previous results file:
+
+    python benchmark.py --output results.json
+    python benchmark.py --baseline results.json --threshold 0.1
+
+The exit status is 1 when a benchmark is slower than the baseline by more than
+the threshold, when importing a simulator loads one of HEAVY_MODULES (torch,
+pygame, ...) or, with --import-budget-ms, when an import is over budget.
+"""
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+import timeit
+
+import numpy as np
+
+DEFAULT_BATCH_SIZES = (1, 64, 1024)
+
+# Season window of the environment benchmarks
+SEASON = (11, 1, 6, 30)
+
+# Modules whose import time is measured, each in a fresh interpreter
+IMPORT_MODULES = ("RWGE", "BatchedRWGE", "WeatherSim", "CropSim")
+
+# Heavy optional dependencies that importing the simulators must not load
+HEAVY_MODULES = ("torch", "IPython", "pygame", "pandas", "prettytable", "matplotlib")
+
+
+def _env_step(batch_size):
+    if batch_size == 1:
+        from RWGE import WheatGrowthEnv
+        env = WheatGrowthEnv(*SEASON, seed=0)
+        env.reset()
+        action = np.array([2.0])
+
+        def step():
+            done = env.step(action)[2]
+            if done:
+                env.reset()
+        return step
+
+    from BatchedRWGE import BatchedWheatGrowthEnv
+    env = BatchedWheatGrowthEnv(batch_size, *SEASON, seed=0)
+    actions = np.full(batch_size, 2.0)
+    return lambda: env.step(actions)
+
+
+def _season(batch_size):
+    from WeatherBank import season_length
+    season_days = season_length(*SEASON)
+    if batch_size == 1:
+        from RWGE import WheatGrowthEnv
+        env = WheatGrowthEnv(*SEASON, seed=0)
+        action = np.array([2.0])
+
+        def episode():
+            env.reset()
+            for _ in range(season_days):
+                if env.step(action)[2]:
+                    break
+        return episode
+
+    from BatchedRWGE import BatchedWheatGrowthEnv
+    env = BatchedWheatGrowthEnv(batch_size, *SEASON, seed=0)
+    actions = np.full(batch_size, 2.0)
+
+    def episode():
+        env.reset()
+        for _ in range(season_days):
+            env.step(actions)
+    return episode
+
+
+def _sim_weather(batch_size):
+    from WeatherSim import WeatherSim
+    weather_sim = WeatherSim(rng=np.random.default_rng(0))
+    if batch_size == 1:
+        return lambda: weather_sim.sim_weather(1)
+    months = np.arange(batch_size) % 12 + 1
+    return lambda: weather_sim.sim_weather_batch(months)
+
+
+def _soil_wetness(batch_size):
+    from SoilSim import SoilSim
+    soil_sim = SoilSim(rng=np.random.default_rng(0))
+    if batch_size == 1:
+        return lambda: soil_sim.get_surface_soil_wetness(1)
+    months = np.arange(batch_size) % 12 + 1
+    return lambda: soil_sim.get_surface_soil_wetness_batch(months)
+
+
+def _growth_stage(batch_size):
+    from CropSim import WheatGrowthModel
+    model = WheatGrowthModel(rng=np.random.default_rng(0))
+    if batch_size == 1:
+        return lambda: model.get_growth_stage_info(1000.0)
+    gdd = np.linspace(0, 3000, batch_size)
+    return lambda: model.get_growth_stage_info(gdd)
+
+
+def _disease_type(batch_size):
+    from CropSim import CropSim
+    crop_sim = CropSim()
+    if batch_size == 1:
+        return lambda: crop_sim.determine_disease_type(220.0, 480.0)
+    scarcity = np.linspace(0, 400, batch_size)
+    excess = np.linspace(0, 700, batch_size)
+    return lambda: crop_sim.determine_disease_type_batch(scarcity, excess)
+
+
+def _et0_inputs(batch_size):
+    # Plausible daily weather: T, RH, u2, PS, QV2M, Rn, G
+    rng = np.random.default_rng(0)
+    return (rng.uniform(5, 35, batch_size), rng.uniform(20, 90, batch_size), rng.uniform(0.5, 6, batch_size),
+            rng.uniform(95, 102, batch_size), rng.uniform(2, 12, batch_size), rng.uniform(0.1, 1, batch_size),
+            rng.uniform(0.01, 0.3, batch_size))
+
+
+def _et0(batch_size):
+    from WeatherSim import ET0_FIELDS, reference_et0
+    inputs = _et0_inputs(batch_size)
+    if batch_size == 1:
+        scalars = [float(values[0]) for values in inputs]
+        return lambda: reference_et0(*scalars)
+    out = np.empty((len(ET0_FIELDS) + 1, batch_size))
+    return lambda: reference_et0(*inputs, out=out)
+
+
+def _et0_df_apply(batch_size):
+    # The notebook's data preparation: a row-wise DataFrame.apply, for comparison with _et0
+    import pandas as pd
+    from WeatherSim import reference_et0
+    df = pd.DataFrame(dict(zip(("T2M", "RH2M", "WS2M", "PS", "QV2M", "rn_daily", "soil_heat_flux"),
+                               _et0_inputs(batch_size))))
+
+    def penman_monteith(row):
+        return reference_et0(row["T2M"], row["RH2M"], row["WS2M"], row["PS"], row["QV2M"],
+                             row["rn_daily"], row["soil_heat_flux"])[0]
+    return lambda: df.apply(penman_monteith, axis=1)
+
+
+# name -> factory returning a callable that processes batch_size items per call
+BENCHMARKS = {
+    "env_step": _env_step,
+    "season": _season,
+    "sim_weather": _sim_weather,
+    "soil_wetness": _soil_wetness,
+    "growth_stage": _growth_stage,
+    "disease_type": _disease_type,
+    "et0": _et0,
+    "et0_df_apply": _et0_df_apply,
+}
+
+
+def time_call(function, repeat=5, min_time=0.2):
+    """Best time per call of ``function`` in seconds, over ``repeat`` runs of about ``min_time`` each."""
+    timer = timeit.Timer(function)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def import_time(module, repeat=3):
+    """Best wall time in seconds of importing ``module`` in a fresh interpreter."""
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        times.append(float(output.stdout.strip().splitlines()[-1]))
+    return min(times)
+
+
+def heavy_imports(module):
+    """HEAVY_MODULES loaded by importing ``module`` in a fresh interpreter."""
+    code = (f"import sys; import {module}; "
+            f"print(' '.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return output.stdout.split()
+
+
+def run(names, batch_sizes, repeat):
+    results = {}
+    for name in names:
+        for batch_size in batch_sizes:
+            seconds = time_call(BENCHMARKS[name](batch_size), repeat=repeat)
+            results[f"{name}[{batch_size}]"] = {
+                "batch_size": batch_size,
+                "us_per_call": seconds * 1e6,
+                "items_per_s": batch_size / seconds,
+            }
+            print(f"{name:>14} [{batch_size:>5}]  {seconds * 1e6:12.2f} us/call  "
+                  f"{batch_size / seconds:14.1f} items/s", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Regressions of ``results`` against ``baseline``.
+
+    Returns:
+    - regressions: List of (name, baseline value, new value) for every time that
+      grew by more than ``threshold`` (a fraction, 0.1 = 10%).
+    """
+    regressions = []
+    for name, result in results["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if previous is not None and result["us_per_call"] > previous["us_per_call"] * (1 + threshold):
+            regressions.append((name, previous["us_per_call"], result["us_per_call"]))
+    for module, seconds in results["import_time_s"].items():
+        previous = baseline.get("import_time_s", {}).get(module)
+        if previous is not None and seconds > previous * (1 + threshold):
+            regressions.append((f"import {module}", previous, seconds))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=list(DEFAULT_BATCH_SIZES))
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), default=list(BENCHMARKS),
+                        help="benchmarks to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs per benchmark, the best is kept")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="allowed slowdown against the baseline, as a fraction (default: 0.1)")
+    parser.add_argument("--no-import-time", action="store_true", help="skip the import time measurements")
+    parser.add_argument("--import-budget-ms", type=float,
+                        help="fail when importing any of the measured modules takes longer")
+    args = parser.parse_args(argv)
+
+    benchmarks = run(args.only, args.batch_sizes, args.repeat)
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+        },
+        "benchmarks": benchmarks,
+        "import_time_s": {} if args.no_import_time else {module: import_time(module) for module in IMPORT_MODULES},
+        "heavy_imports": {} if args.no_import_time else {module: heavy_imports(module) for module in IMPORT_MODULES},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    for module, seconds in results["import_time_s"].items():
+        print(f"import {module}: {seconds * 1e3:.1f} ms")
+    print(f"peak RSS: {results['peak_rss_mb']:.1f} MB")
+
+    # Import checks fail the run on their own, without a baseline
+    failed = False
+    for module, loaded in results["heavy_imports"].items():
+        if loaded:
+            print(f"IMPORT {module} loads {', '.join(loaded)}")
+            failed = True
+    if args.import_budget_ms is not None:
+        for module, seconds in results["import_time_s"].items():
+            if seconds * 1e3 > args.import_budget_ms:
+                print(f"IMPORT {module} takes {seconds * 1e3:.1f} ms, over the {args.import_budget_ms:g} ms budget")
+                failed = True
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, previous, current in regressions:
+            print(f"REGRESSION {name}: {previous:.6g} -> {current:.6g} ({current / previous - 1:+.1%})")
+        if regressions:
+            return 1
+        print(f"No regression above {args.threshold:.0%} against {args.baseline}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2 @@
+# test_environment.py is an interactive pygame loop, run by hand
+collect_ignore = ["test_environment.py"]
@@ -0,0 +1,87 @@
+"""
+Invalidation of the binary CSV cache.
+
+    python -m pytest test_csv_cache.py
+"""
+import json
+import os
+
+import numpy as np
+
+import CsvCache
+
+
+class _CountingParser:
+    # parse() for load_cached_columns that counts the CSV parses
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, path):
+        self.calls += 1
+        return {"x": np.loadtxt(path, skiprows=1, ndmin=1)}
+
+
+def _write_csv(path, values):
+    with open(path, "w") as f:
+        f.write("x\n" + "".join(f"{value}\n" for value in values))
+
+
+def _metadata(path):
+    with open(os.path.join(CsvCache.cache_directory(path), "meta.json")) as f:
+        return json.load(f)
+
+
+def test_reused_while_unchanged(tmp_path):
+    path = str(tmp_path / "data.csv")
+    _write_csv(path, [1, 2, 3])
+    parse = _CountingParser()
+    CsvCache.load_cached_columns(path, parse)
+    columns = CsvCache.load_cached_columns(path, parse)
+    assert parse.calls == 1
+    assert isinstance(columns["x"], np.memmap)
+    np.testing.assert_array_equal(columns["x"], [1, 2, 3])
+
+
+def test_rebuilt_on_content_change(tmp_path):
+    path = str(tmp_path / "data.csv")
+    _write_csv(path, [1, 2, 3])
+    parse = _CountingParser()
+    CsvCache.load_cached_columns(path, parse)
+    _write_csv(path, [4, 5, 6])
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    columns = CsvCache.load_cached_columns(path, parse)
+    assert parse.calls == 2
+    np.testing.assert_array_equal(columns["x"], [4, 5, 6])
+
+
+def test_touch_refreshes_mtime_without_rebuild(tmp_path, monkeypatch):
+    path = str(tmp_path / "data.csv")
+    _write_csv(path, [1, 2, 3])
+    parse = _CountingParser()
+    CsvCache.load_cached_columns(path, parse)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    hashes = []
+    file_sha256 = CsvCache._file_sha256
+    monkeypatch.setattr(CsvCache, "_file_sha256", lambda path: hashes.append(path) or file_sha256(path))
+    CsvCache.load_cached_columns(path, parse)
+    assert parse.calls == 1 and len(hashes) == 1
+    assert _metadata(path)["source_mtime_ns"] == os.stat(path).st_mtime_ns
+
+    # The refreshed mtime spares the hash on the next load
+    CsvCache.load_cached_columns(path, parse)
+    assert parse.calls == 1 and len(hashes) == 1
+
+
+def test_rebuilt_on_version_bump(tmp_path, monkeypatch):
+    path = str(tmp_path / "data.csv")
+    _write_csv(path, [1, 2, 3])
+    parse = _CountingParser()
+    CsvCache.load_cached_columns(path, parse)
+    monkeypatch.setattr(CsvCache, "CACHE_VERSION", CsvCache.CACHE_VERSION + 1)
+    CsvCache.load_cached_columns(path, parse)
+    assert parse.calls == 2
+    assert _metadata(path)["version"] == CsvCache.CACHE_VERSION
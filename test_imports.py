@@ -0,0 +1,38 @@
+"""
+Import checks of the simulator modules, each imported in a fresh interpreter.
+
+    python test_imports.py
+
+Fails when importing a module of benchmark.IMPORT_MODULES loads one of
+benchmark.HEAVY_MODULES, or takes longer than IMPORT_BUDGET_MS.
+"""
+import sys
+
+from benchmark import HEAVY_MODULES, IMPORT_MODULES, heavy_imports, import_time
+
+# Best import time allowed per module; gym alone takes most of it
+IMPORT_BUDGET_MS = 500
+
+
+def test_no_heavy_imports():
+    loaded = {module: heavy_imports(module) for module in IMPORT_MODULES}
+    failures = {module: names for module, names in loaded.items() if names}
+    assert not failures, f"Importing these modules loads {HEAVY_MODULES} entries: {failures}"
+
+
+def test_import_time():
+    times = {module: import_time(module) * 1e3 for module in IMPORT_MODULES}
+    slow = {module: round(ms, 1) for module, ms in times.items() if ms > IMPORT_BUDGET_MS}
+    assert not slow, f"Imports over the {IMPORT_BUDGET_MS} ms budget (ms): {slow}"
+
+
+if __name__ == "__main__":
+    failed = False
+    for test in (test_no_heavy_imports, test_import_time):
+        try:
+            test()
+            print(f"{test.__name__}: ok")
+        except AssertionError as error:
+            print(f"{test.__name__}: FAILED\n  {error}")
+            failed = True
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,79 @@
+"""
+Same seed, same trajectories: for WheatGrowthEnv, BatchedWheatGrowthEnv and
+SubprocWheatGrowthEnv whatever its number of workers.
+
+    python -m pytest test_seeding.py
+"""
+import numpy as np
+
+from BatchedRWGE import BatchedWheatGrowthEnv
+from RWGE import WheatGrowthEnv
+from Seeding import spawn_seeds
+from SubprocRWGE import SubprocWheatGrowthEnv
+
+SEASON = (11, 1, 6, 30)
+N_ENVS = 8
+N_STEPS = 60
+
+
+def _actions(n_envs):
+    return np.random.default_rng(0).uniform(0, 11, (N_STEPS, n_envs))
+
+
+def _env_rollout(seed):
+    env = WheatGrowthEnv(*SEASON, seed=seed, observation_mode="flat")
+    rollout = [env.reset().copy()]
+    for action in _actions(1):
+        observation, reward, done, info = env.step(action)
+        rollout += [observation.copy(), reward, done]
+        if done:
+            rollout.append(env.reset().copy())
+    return rollout
+
+
+def _batched_rollout(seed, fields=slice(None)):
+    # Rollout of the given fields of a N_ENVS batch, with their columns of the actions
+    actions = _actions(N_ENVS)[:, fields]
+    env = BatchedWheatGrowthEnv(actions.shape[1], *SEASON, seed=seed, observation_mode="flat")
+    rollout = [env.reset().copy()]
+    for step_actions in actions:
+        observation, reward, done, info = env.step(step_actions)
+        rollout += [observation.copy(), reward, done]
+    return rollout
+
+
+def _subproc_rollout(n_workers, seed):
+    env = SubprocWheatGrowthEnv(N_ENVS, *SEASON, n_workers=n_workers, seed=seed)
+    try:
+        rollout = [env.reset().copy()]
+        for actions in _actions(N_ENVS):
+            observation, reward, done, info = env.step(actions)
+            rollout += [observation.copy(), reward.copy(), done.copy()]
+    finally:
+        env.close()
+    return rollout
+
+
+def _assert_identical(first, second):
+    assert len(first) == len(second)
+    for a, b in zip(first, second):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_env_same_seed_same_rollout():
+    _assert_identical(_env_rollout(42), _env_rollout(42))
+
+
+def test_batched_env_same_seed_same_rollout():
+    _assert_identical(_batched_rollout(42), _batched_rollout(42))
+    _assert_identical(_batched_rollout(spawn_seeds(42, N_ENVS)), _batched_rollout(spawn_seeds(42, N_ENVS)))
+
+
+def test_subproc_matches_serial_fields():
+    # Field i of the subproc env replays a lone field seeded with spawn_seeds(seed, n)[i]
+    serial = [_batched_rollout([child], [field]) for field, child in enumerate(spawn_seeds(42, N_ENVS))]
+    serial = [np.concatenate(values) for values in zip(*serial)]
+    for n_workers in (1, 4):
+        subproc = _subproc_rollout(n_workers, 42)
+        subproc = [np.asarray(value).reshape(np.shape(expected)) for value, expected in zip(subproc, serial)]
+        _assert_identical(subproc, serial)
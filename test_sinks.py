@@ -0,0 +1,61 @@
+"""
+Resuming an interrupted DateSIM.stream into a CsvSink.
+
+    python -m pytest test_sinks.py
+"""
+import pytest
+
+from DateSim import DateSIM
+from Seeding import make_rng
+from Sinks import CsvSink, RowSink
+
+N_DAYS = 100
+CHUNK_SIZE = 16
+
+
+class _Interrupted(Exception):
+    pass
+
+
+class _InterruptSink(RowSink):
+    # Raises after ``after`` rows, like a run killed in the middle of a chunk
+
+    def __init__(self, after):
+        super().__init__(DateSIM.COLUMNS)
+        self.after = after
+
+    def add_row(self, row):
+        if self.rows >= self.after:
+            raise _Interrupted
+        super().add_row(row)
+
+    def _write_chunk(self, rows, state):
+        pass
+
+
+def _simulation():
+    return DateSIM(1, 11, N_DAYS, rng=make_rng(7))
+
+
+def _read(path):
+    with open(path, newline="") as f:
+        return f.read()
+
+
+def test_resumed_stream_matches_uninterrupted_run(tmp_path):
+    expected_path = str(tmp_path / "expected.csv")
+    _simulation().stream([CsvSink(expected_path, DateSIM.COLUMNS, chunk_size=CHUNK_SIZE)])
+
+    path = str(tmp_path / "resumed.csv")
+    sink = CsvSink(path, DateSIM.COLUMNS, chunk_size=CHUNK_SIZE)
+    with pytest.raises(_Interrupted):
+        _simulation().stream([sink, _InterruptSink(after=2 * CHUNK_SIZE + 5)])
+    sink._file.close()
+    # A row cut off by the interruption, after the last saved chunk
+    with open(path, "a", newline="") as f:
+        f.write("12,3,55,Winter,1")
+
+    simulated = _simulation().stream([CsvSink(path, DateSIM.COLUMNS, chunk_size=CHUNK_SIZE)], resume=True)
+    assert simulated == N_DAYS - 2 * CHUNK_SIZE
+    assert _read(path) == _read(expected_path)
+    assert len(_read(path).splitlines()) == N_DAYS + 1
@@ -0,0 +1,48 @@
+"""
+Crash handling of SubprocWheatGrowthEnv.
+
+    python -m pytest test_subproc.py
+"""
+import os
+import signal
+
+import numpy as np
+
+from SubprocRWGE import WORKER_RESTARTED, SubprocWheatGrowthEnv
+
+
+def _kill(env, index):
+    process = env._processes[index]
+    os.kill(process.pid, signal.SIGKILL)
+    process.join()
+
+
+def test_worker_killed_between_steps_is_restarted():
+    env = SubprocWheatGrowthEnv(4, 11, 1, 6, 30, n_workers=2, seed=1, timeout=10)
+    try:
+        env.reset()
+        env.step(np.ones(4))
+        _kill(env, 1)
+        observation, reward, done, info = env.step(np.ones(4))
+        assert done.tolist() == [False, False, True, True]
+        assert info["restarted"].tolist() == [False, False, True, True]
+        assert (info["termination_reason"][2:] == WORKER_RESTARTED).all()
+        assert np.isfinite(observation).all()
+
+        # The replacement worker keeps stepping
+        observation, reward, done, info = env.step(np.ones(4))
+        assert "restarted" not in info
+    finally:
+        env.close()
+
+
+def test_worker_killed_before_reset_is_restarted():
+    env = SubprocWheatGrowthEnv(4, 11, 1, 6, 30, n_workers=2, seed=1, timeout=10)
+    try:
+        env.reset()
+        _kill(env, 0)
+        observation = env.reset(seed=2)
+        assert np.isfinite(observation).all()
+        env.step(np.ones(4))
+    finally:
+        env.close()